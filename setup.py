@@ -14,6 +14,9 @@ setup(
     entry_points={
         "gui_scripts": [
             "driving_statistics = driving_statistics.main:main"
+        ],
+        "console_scripts": [
+            "driving_statistics_cli = driving_statistics.cli:main"
         ]
     },
 )
\ No newline at end of file
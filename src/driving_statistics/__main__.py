@@ -0,0 +1,3 @@
+from driving_statistics.main import main
+
+main()
@@ -0,0 +1,321 @@
+"""Repeatable benchmark suite over a synthetic DGT dataset.
+
+Generates a dataset, imports it into a scratch database and times the
+import, filtered and grouped queries, table population, chart build and
+PDF export. The query plans of the filter and group queries are checked
+for full scans of exams. Every run is appended as one JSON line to the
+results file (benchmarks.jsonl in the current directory unless --output
+says otherwise) and compared with the previous run of the same size. Usage::
+
+    python -m driving_statistics.benchmark [--rows 100000] [--repeat 5]
+
+The table, chart and PDF cases need PyQt6 and are reported as skipped
+without it.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from driving_statistics import synthetic_data
+from driving_statistics.services import database
+from driving_statistics.services.queries import (
+    ALL_MONTHS, all_rows_filters, build_filtered_query, chart_data, run_filtered_query)
+
+# Relative to the working directory, never inside the installed package.
+RESULTS_PATH = Path("benchmarks.jsonl")
+REPEAT = 3
+# Relative slowdown against the previous run that counts as a regression.
+REGRESSION_THRESHOLD = 0.2
+TABLE_SCROLL_ROWS = 20000
+PDF_ROWS = 5000
+QUERY_COLS = [
+    "province", "exam_center", "driving_school", "exam_type", "exam_month", "presented", "passed", "failed",
+]
+
+
+def _filters(**overrides):
+    filters = {
+        "province": "",
+        "exam_center": "",
+        "driving_school": "",
+        "exam_type": "",
+        "from_ym": ALL_MONTHS[0],
+        "to_ym": ALL_MONTHS[1],
+        "limit": 0,
+        "group_by": "",
+    }
+    filters.update(overrides)
+    return filters
+
+
+def _fetch_all(cols, filters):
+    sql, params, _cols, _headers = build_filtered_query(cols, filters)
+    return sum(len(batch) for batch in database.iter_fetch(sql, params))
+
+
+def _qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def _table_populate():
+    from PyQt6.QtCore import QModelIndex
+    from driving_statistics.view.table_model import QueryTableModel
+
+    _qt_app()
+    sql, params, cols, headers = build_filtered_query(QUERY_COLS, all_rows_filters())
+    model = QueryTableModel()
+    model.set_query(sql, params, cols, headers)
+    while model.canFetchMore(QModelIndex()) and model.rowCount() < TABLE_SCROLL_ROWS:
+        model.fetchMore(QModelIndex())
+    return model.rowCount()
+
+
+def _chart_build():
+    _qt_app()
+    from driving_statistics.services.charts import ExamChartsView
+
+    data = chart_data(QUERY_COLS, _filters())
+    view = ExamChartsView()
+    view.set_data(data)
+    return len(data["months"])
+
+
+def _pdf_export(workdir):
+    from driving_statistics.services.reports import export_rows_pdf
+
+    _qt_app()
+    sql, params, cols, headers = build_filtered_query(QUERY_COLS, _filters(limit=PDF_ROWS))
+    return export_rows_pdf(sql, params, cols, headers, str(workdir / "bench.pdf"))["rows"]
+
+
+def _filtered_query(**overrides):
+    # The controller path: totals plus the cached rows when the result is small.
+    result = run_filtered_query(QUERY_COLS, _filters(**overrides))
+    return len(result["rows"]) if result["rows"] is not None else None
+
+
+def cases(workdir):
+    # (name, needs_qt, callable returning a row count)
+    return [
+        ("query.province", False, lambda: _filtered_query(province="Madrid")),
+        ("query.school_text", False, lambda: _fetch_all(QUERY_COLS, _filters(driving_school="RONDA 1"))),
+        ("query.month_range", False, lambda: _fetch_all(QUERY_COLS, _filters(from_ym="2000-03", to_ym="2000-05"))),
+        ("group.province", False, lambda: _fetch_all(QUERY_COLS, _filters(group_by="province"))),
+        ("group.month", False, lambda: _fetch_all(QUERY_COLS, _filters(group_by="exam_month"))),
+        ("group.school", False, lambda: _fetch_all(QUERY_COLS, _filters(group_by="driving_school"))),
+        ("group.school_month_metrics", False, lambda: _fetch_all(QUERY_COLS, _filters(
+            group_by=["province", "driving_school", "exam_month"],
+            metrics=["pass_rate", "presented_delta", "rank_in_province"],
+        ))),
+        ("pivot.province_month", False, lambda: _fetch_all(QUERY_COLS, _filters(
+            group_by=["province"], pivot="exam_month", pivot_metric="pass_rate",
+        ))),
+        ("chart.data", False, lambda: len(chart_data(QUERY_COLS, _filters())["months"])),
+        ("table.populate", True, _table_populate),
+        ("chart.build", True, _chart_build),
+        ("report.pdf", True, lambda: _pdf_export(workdir)),
+    ]
+
+
+def plan_cases():
+    # Filter and group queries that must be answered without reading all of exams.
+    return {
+        "query.province": _filters(province="Madrid"),
+        "query.school_text": _filters(driving_school="RONDA 1"),
+        "query.month_range": _filters(from_ym="2000-03", to_ym="2000-05"),
+        "query.type_month_range": _filters(exam_type="TEORICA", from_ym="2000-03", to_ym="2000-05"),
+        "group.province": _filters(group_by="province"),
+        "group.month": _filters(group_by="exam_month"),
+        "group.school": _filters(group_by="driving_school", province="Madrid"),
+        "group.type_month": _filters(group_by=["exam_type", "exam_month"], exam_type="TEORICA"),
+        "pivot.province_month": _filters(group_by=["province"], pivot="exam_month", pivot_metric="pass_rate"),
+    }
+
+
+def full_scans_of_exams():
+    """EXPLAIN QUERY PLAN every plan case; return the cases that scan exams."""
+    found = {}
+    for name, filters in plan_cases().items():
+        sql, params, _cols, _headers = build_filtered_query(QUERY_COLS, filters)
+        # Scans of a rollup are expected: they are small and read whole.
+        scans = [step for step in database.full_table_scans(sql, params) if step.split()[1] == "exams"]
+        if scans:
+            found[name] = scans
+    return found
+
+
+def _qt_available():
+    try:
+        import PyQt6.QtWidgets  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _timed(func, repeat):
+    times = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = func()
+        times.append(time.perf_counter() - start)
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "min_ms": round(min(times) * 1000, 3),
+        "rows": rows,
+    }
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _use_database(path):
+    database.close_read_connections()
+    database.DB_PATH = path
+    database.DATA_DIR = path.parent
+    database.init_database()
+
+
+def run(rows, repeat=REPEAT, files=1, seed=synthetic_data.SEED, workdir=None, engine="python"):
+    scratch = workdir is None
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="driving_bench_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    saved_paths = database.DB_PATH, database.DATA_DIR
+    result = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "rows": rows,
+        "files": files,
+        "seed": seed,
+        "repeat": repeat,
+        "engine": engine,
+        "cases": {},
+    }
+    try:
+        dataset = workdir / ("dataset" if files > 1 else "dataset.txt")
+        start = time.perf_counter()
+        synthetic_data.write_dataset(dataset, rows, seed, files)
+        result["generate_seconds"] = round(time.perf_counter() - start, 3)
+
+        db_path = workdir / "bench.db"
+        for leftover in workdir.glob("bench.db*"):
+            leftover.unlink()
+        _use_database(db_path)
+
+        from driving_statistics.services.csv_importer import import_path
+
+        start = time.perf_counter()
+        stats = import_path(dataset, engine=engine)
+        result["cases"]["import"] = {
+            "median_ms": round((time.perf_counter() - start) * 1000, 3),
+            "rows": stats["inserted"],
+            "rows_per_sec": round(stats["rows_per_sec"]),
+        }
+
+        result["full_scans"] = full_scans_of_exams()
+
+        has_qt = _qt_available()
+        for name, needs_qt, func in cases(workdir):
+            if needs_qt and not has_qt:
+                result["cases"][name] = {"skipped": "PyQt6 no disponible"}
+                continue
+            result["cases"][name] = _timed(func, repeat)
+    finally:
+        database.close_read_connections()
+        database.DB_PATH, database.DATA_DIR = saved_paths
+        if scratch:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def previous_run(path, rows):
+    if not Path(path).exists():
+        return None
+    last = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("rows") == rows:
+                last = entry
+    return last
+
+
+def compare(result, previous, threshold=REGRESSION_THRESHOLD):
+    """Return report lines and the names of the cases that got slower."""
+    lines = [f"{'caso':<20}{'ms':>12}{'anterior':>12}{'cambio':>10}"]
+    regressions = []
+    for name, case in result["cases"].items():
+        if "skipped" in case:
+            lines.append(f"{name:<20}{'omitido':>12}")
+            continue
+        before = ((previous or {}).get("cases") or {}).get(name, {}).get("median_ms")
+        shown_before = f"{before:.1f}" if before else ""
+        change = ""
+        if before:
+            ratio = case["median_ms"] / before - 1
+            change = f"{ratio:+.0%}"
+            if ratio > threshold:
+                regressions.append(name)
+                change += " !"
+        lines.append(f"{name:<20}{case['median_ms']:>12.1f}{shown_before:>12}{change:>10}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="driving_statistics.benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=1, help="repartir el dataset en varios ficheros")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=synthetic_data.SEED)
+    parser.add_argument("--output", default=str(RESULTS_PATH), help="fichero JSONL de resultados")
+    parser.add_argument("--workdir", help="carpeta de trabajo (por defecto, temporal)")
+    parser.add_argument("--engine", choices=("python", "pandas"), default="python")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--fail-on-regression", action="store_true", help="salir con 1 si hay regresiones o recorridos completos")
+    args = parser.parse_args(argv)
+
+    previous = previous_run(args.output, args.rows)
+    result = run(args.rows, args.repeat, args.files, args.seed, args.workdir, args.engine)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    lines, regressions = compare(result, previous, args.threshold)
+    print("\n".join(lines))
+    if previous:
+        print(f"comparado con {previous.get('revision') or '?'} ({previous['ts']})")
+    if regressions:
+        print(f"Mas lentos que la ejecucion anterior: {', '.join(regressions)}", file=sys.stderr)
+    for name, scans in result["full_scans"].items():
+        print(f"{name} recorre exams entera: {'; '.join(scans)}", file=sys.stderr)
+    failed = regressions or result["full_scans"]
+    return 1 if failed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
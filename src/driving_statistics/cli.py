@@ -0,0 +1,190 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# Headless entry point: only the sqlite-based services are imported here, never PyQt.
+from driving_statistics.services import database
+from driving_statistics.services.database import COLUMNS, init_database, iter_rows
+from driving_statistics.services.queries import (
+    ALL_MONTHS, DERIVED_METRICS, PIVOT_METRICS, build_filtered_query)
+
+COMMANDS = ("import", "query", "aggregate", "export", "archive", "compact")
+
+
+def _add_filter_args(parser):
+    parser.add_argument("--province", default="")
+    parser.add_argument("--center", default="")
+    parser.add_argument("--school", default="")
+    parser.add_argument("--type", default="")
+    parser.add_argument("--from", dest="from_ym", default=ALL_MONTHS[0], help="YYYY-MM")
+    parser.add_argument("--to", dest="to_ym", default=ALL_MONTHS[1], help="YYYY-MM")
+    parser.add_argument("--cols", default="", help="columnas separadas por comas")
+    parser.add_argument("--limit", type=int, default=0)
+
+
+def _add_output_args(parser, default_format):
+    parser.add_argument("--format", choices=("csv", "jsonl"), default=default_format)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="driving_statistics")
+    parser.add_argument("--db", help="ruta de la base de datos SQLite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="importar ficheros, carpetas o ZIP")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--engine", choices=("python", "pandas"), default="python", help="lector de ficheros")
+
+    p = sub.add_parser("query", help="filas filtradas por stdout")
+    _add_filter_args(p)
+    _add_output_args(p, "csv")
+
+    p = sub.add_parser("aggregate", help="totales agrupados por stdout")
+    _add_filter_args(p)
+    p.add_argument("--by", required=True, help="niveles separados por comas, p. ej. province,exam_center,exam_month")
+    p.add_argument("--metrics", default="", help=f"metricas derivadas: {', '.join(DERIVED_METRICS)}")
+    p.add_argument("--pivot", default="", help="columna cuyos valores pasan a ser columnas")
+    p.add_argument("--pivot-metric", default="presented", choices=PIVOT_METRICS)
+    _add_output_args(p, "csv")
+
+    p = sub.add_parser("export", help="filas filtradas a un fichero")
+    _add_filter_args(p)
+    _add_output_args(p, "csv")
+    p.add_argument("--output", required=True)
+
+    p = sub.add_parser("archive", help="mover años antiguos a ficheros de solo lectura")
+    p.add_argument("years", nargs="+", help="YYYY")
+
+    p = sub.add_parser("compact", help="compactar ficheros de años archivados")
+    p.add_argument("years", nargs="*", help="YYYY (por defecto, todos)")
+    return parser
+
+
+def _filters(args, group_by=""):
+    metrics = [m.strip() for m in getattr(args, "metrics", "").split(",") if m.strip()]
+    unknown = [m for m in metrics if m not in DERIVED_METRICS]
+    if unknown:
+        raise SystemExit(f"Metricas desconocidas: {', '.join(unknown)}")
+    return {
+        "province": args.province,
+        "exam_center": args.center,
+        "driving_school": args.school,
+        "exam_type": args.type,
+        "from_ym": args.from_ym,
+        "to_ym": args.to_ym,
+        "limit": args.limit,
+        "group_by": group_by,
+        "metrics": metrics,
+        "pivot": getattr(args, "pivot", ""),
+        "pivot_metric": getattr(args, "pivot_metric", "presented"),
+    }
+
+
+def _cols(args):
+    known = dict(COLUMNS)
+    cols = [c.strip() for c in args.cols.split(",") if c.strip()]
+    unknown = [c for c in cols if c not in known]
+    if unknown:
+        raise SystemExit(f"Columnas desconocidas: {', '.join(unknown)}")
+    return cols
+
+
+def _write_rows(rows, cols, fmt, out):
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(cols)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(cols, row)), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def _run_query(args, group_by="", out=None):
+    try:
+        sql, params, cols, _headers = build_filtered_query(_cols(args), _filters(args, group_by))
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    rows = iter_rows(sql, params)
+    if out is not None:
+        return {"rows": _write_rows(rows, cols, args.format, out)}
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        return {"rows": _write_rows(rows, cols, args.format, f), "output": args.output}
+
+
+def _cmd_import(args):
+    from driving_statistics.services.csv_importer import import_path
+
+    results = []
+    for path in args.paths:
+        stats = import_path(path, workers=args.workers, engine=args.engine)
+        results.append({"path": path, **stats})
+    return {"files": results}
+
+
+def _cmd_query(args):
+    return _run_query(args, out=sys.stdout)
+
+
+def _cmd_aggregate(args):
+    return _run_query(args, group_by=args.by, out=sys.stdout)
+
+
+def _cmd_export(args):
+    return _run_query(args)
+
+
+def _cmd_archive(args):
+    from driving_statistics.services.partitions import archive_year
+
+    try:
+        return {"partitions": [archive_year(year) for year in args.years]}
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+
+def _cmd_compact(args):
+    from driving_statistics.services.partitions import compact_partition
+
+    years = args.years or [year for year, _first, _last in database.sealed_partitions()]
+    try:
+        return {"partitions": [compact_partition(year) for year in years]}
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+
+HANDLERS = {
+    "import": _cmd_import,
+    "query": _cmd_query,
+    "aggregate": _cmd_aggregate,
+    "export": _cmd_export,
+    "archive": _cmd_archive,
+    "compact": _cmd_compact,
+}
+
+
+def main(argv=None):
+    start = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    if args.db:
+        database.DB_PATH = Path(args.db)
+        database.DATA_DIR = database.DB_PATH.parent
+    init_database()
+
+    result = HANDLERS[args.command](args)
+    # Timings go to stderr as one JSON line so stdout stays pipeable.
+    timing = {"command": args.command, "seconds": round(time.perf_counter() - start, 6), **result}
+    print(json.dumps(timing, ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
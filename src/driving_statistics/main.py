@@ -1,10 +1,21 @@
-# main.py
 import sys
-from PyQt6.QtWidgets import QApplication
-from driving_statistics.mainc import MainController  # si MainController está en otro archivo
-from driving_statistics.services.database import init_database
+from multiprocessing import freeze_support
+
 
 def main():
+    # Bulk imports parse files in a process pool; required for frozen builds.
+    freeze_support()
+
+    # Subcommands run headless and never import PyQt.
+    from driving_statistics.cli import COMMANDS
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS + ("-h", "--help", "--db"):
+        from driving_statistics.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from PyQt6.QtWidgets import QApplication
+    from driving_statistics.mainc import MainController  # si MainController está en otro archivo
+    from driving_statistics.services.database import init_database
+
     init_database()
     app = QApplication(sys.argv)
     win = MainController()
@@ -13,4 +24,4 @@ def main():
 
 # Permite ejecutar directamente con python main.py
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -7,35 +7,73 @@ if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 import sys
 import re
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
-    QApplication, QFileDialog, QMessageBox, QTableWidgetItem,
-    QDialog, QVBoxLayout, QRadioButton, QDialogButtonBox)
+    QApplication, QFileDialog, QMessageBox,
+    QDialog, QVBoxLayout, QRadioButton, QDialogButtonBox, QProgressDialog)
 
 from driving_statistics.view.main_window import MainWindowUI
-from driving_statistics.view.filtres import FilterDialog
-from driving_statistics.services.database import init_database, fetch, COLUMNS
-from driving_statistics.services.csv_importer import save_csv_to_db
-from driving_statistics.services.charts import build_chart_view
-from driving_statistics.services.reports import export_table_pdf, export_html_pdf
+from driving_statistics.view.table_model import QueryTableModel
+from driving_statistics.services import profiler
+from driving_statistics.services.database import init_database, COLUMNS
+from driving_statistics.services.queries import (
+    RATE_METRICS, all_rows_filters, chart_data, data_overview, normalize_filters, run_filtered_query,
+    summarize_totals)
+from driving_statistics.services.query_cache import QueryCache, filter_key
+from driving_statistics.services.workers import ImportWorker, QueryWorker, ReportWorker
+# The filter dialog, charts (QtCharts) and reports (QtPrintSupport) are imported
+# where they are first used so none of them delays the first window.
 
 
 
+def _skipped_text(stats):
+    parts = []
+    if stats.get("skipped_files"):
+        parts.append(f"{stats['skipped_files']} ficheros ya importados")
+    if stats.get("skipped_rows"):
+        parts.append(f"{stats['skipped_rows']} filas de meses y provincias ya cargados")
+    return "\nOmitidos: " + ", ".join(parts) if parts else ""
+
+
 class MainController(MainWindowUI):
+    data_imported = pyqtSignal()
+
     def __init__(self):
         super().__init__()
 
         menu = self.menuBar().addMenu("Archivo")
-        menu.addAction("Importar CSV/TXT", self.import_txt)
+        self.import_actions = [
+            menu.addAction("Importar CSV/TXT", self.import_txt),
+            menu.addAction("Importar carpeta", self.import_folder),
+            menu.addAction("Importar ZIP", self.import_zip),
+        ]
         menu.addAction("Aplicar filtros", self.open_filter_dialog)
+        menu.addAction("Ver todas las filas", self.load_detail_rows)
         menu.addAction("Generar PDF", self.export_pdf)
+        view_menu = self.menuBar().addMenu("Ver")
+        view_menu.addAction("Filtro rapido", self.show_live_filter_panel)
+        view_menu.addAction("Panel de rendimiento", self.show_profiler_panel)
         toolbar = self.addToolBar("Acciones")
         toolbar.addAction("Aplicar filtros", self.open_filter_dialog)
+        toolbar.addAction("Ver todas las filas", self.load_detail_rows)
         toolbar.addAction("Generar PDF", self.export_pdf)
         self.chart_widget = None
-        self.last_rows = []
+        self.profiler_panel = None
+        self.live_filter_panel = None
+        self.query_worker = None
+        self.live_request_id = 0
+        # Columns picked in the filter dialog; live filters reuse them.
+        self.filter_cols = [k for k, _ in COLUMNS]
+        self.last_sql = ""
+        self.last_params = []
         self.last_cols = []
         self.last_headers = []
         self.has_imported_data = False
+        self.import_worker = None
+        self.import_progress = None
+        self.report_worker = None
+        self.report_progress = None
+        self.showing_overview = False
         self.last_filters = {
             "province": "",
             "exam_center": "",
@@ -46,18 +84,40 @@ class MainController(MainWindowUI):
             "limit": 0,
             "group_by": "",
         }
+        self.result_cache = QueryCache()
+        self.table_model = QueryTableModel(self._format_value_for_table, self)
+        self.table.setModel(self.table_model)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
         self.table.setSortingEnabled(True)
-        self.load_initial_data()
+        self.pending_chart = None
+        self.tabs.currentChanged.connect(self._on_tab_changed)
+        self.data_imported.connect(self.refresh_after_import)
+        # Let the window paint before the first query runs.
+        QTimer.singleShot(0, self.load_initial_data)
 
     def load_initial_data(self):
-        cols = [k for k, _ in COLUMNS]
-        rows = fetch(f"SELECT {', '.join(cols)} FROM exams")
-        self.last_rows = rows
-        self.last_cols = cols
-        self.last_headers = [lbl for _, lbl in COLUMNS]
-        self.has_imported_data = len(rows) > 0
-        self.render_table(rows, cols, self.last_headers)
-        self.update_chart(rows, cols)
+        # Start from metadata and the province rollup; detail rows are only
+        # read when the user asks for them.
+        overview = data_overview()
+        self.has_imported_data = overview["rows"] > 0
+        if not overview["first_month"]:
+            self.overview_label.setText(f"{overview['rows']} filas")
+            return
+
+        first = self._format_value_for_table("exam_month", overview["first_month"])
+        last = self._format_value_for_table("exam_month", overview["last_month"])
+        self.overview_label.setText(f"{overview['rows']} filas, de {first} a {last}")
+        filters = dict(
+            self.last_filters,
+            from_ym=overview["first_month"],
+            to_ym=overview["last_month"],
+            group_by="province",
+        )
+        self.load_filtered_data(["province", "presented", "passed", "failed"], filters)
+        self.showing_overview = True
+
+    def load_detail_rows(self):
+        self.load_filtered_data([k for k, _ in COLUMNS], all_rows_filters(self.last_filters))
 
     def import_txt(self):
         path, _ = QFileDialog.getOpenFileName(
@@ -68,105 +128,166 @@ class MainController(MainWindowUI):
         )
         if not path:
             return
+        self.start_import(path)
 
-        try:
-            save_csv_to_db(path)
-            self.has_imported_data = True
-            self.open_filter_dialog()
+    def import_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "Importar carpeta de datos")
+        if not path:
+            return
+        self.start_import(path)
 
-            QMessageBox.information(self, "OK", "TXT importado")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+    def import_zip(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Importar ZIP", "", "ZIP (*.zip)")
+        if not path:
+            return
+        self.start_import(path)
+
+    def _make_progress_dialog(self, title, label):
+        dlg = QProgressDialog(label, "Cancelar", 0, 0, self)
+        dlg.setWindowTitle(title)
+        dlg.setWindowModality(Qt.WindowModality.WindowModal)
+        dlg.setMinimumDuration(0)
+        dlg.setAutoClose(False)
+        dlg.setAutoReset(False)
+        return dlg
+
+    def start_import(self, path):
+        self.import_progress = self._make_progress_dialog("Importar datos", "Importando...")
+
+        self.import_worker = ImportWorker(path, self)
+        self.import_worker.progress.connect(self._on_import_progress)
+        self.import_worker.succeeded.connect(self._on_import_succeeded)
+        self.import_worker.failed.connect(self._on_import_failed)
+        self.import_worker.cancelled.connect(self._on_import_cancelled)
+        self.import_worker.finished.connect(self._on_import_finished)
+        self.import_progress.canceled.connect(self.import_worker.cancel)
+
+        for action in self.import_actions:
+            action.setEnabled(False)
+        self.import_worker.start()
+        self.import_progress.show()
+
+    def _on_import_progress(self, parsed, inserted):
+        if self.import_progress is not None:
+            self.import_progress.setLabelText(
+                f"Filas leidas: {parsed}\nFilas insertadas: {inserted}"
+            )
+
+    def _on_import_succeeded(self, stats):
+        self._close_import_progress()
+        self.has_imported_data = True
+        self.data_imported.emit()
+        QMessageBox.information(
+            self,
+            "OK",
+            f"TXT importado: {stats['inserted']} filas nuevas de {stats['parsed']} "
+            f"({stats['rows_per_sec']:.0f} filas/s)" + _skipped_text(stats)
+        )
+        self.open_filter_dialog()
+
+    def _on_import_failed(self, message):
+        self._close_import_progress()
+        QMessageBox.critical(self, "Error", message)
+
+    def _on_import_cancelled(self):
+        self._close_import_progress()
+        QMessageBox.information(
+            self,
+            "Importar datos",
+            "Importacion cancelada. Las filas ya confirmadas se conservan; "
+            "al importar de nuevo el mismo fichero se continua desde ese punto."
+        )
+
+    def _on_import_finished(self):
+        for action in self.import_actions:
+            action.setEnabled(True)
+        self.import_worker.deleteLater()
+        self.import_worker = None
+
+    def _close_import_progress(self):
+        if self.import_progress is not None:
+            self.import_progress.close()
+            self.import_progress.deleteLater()
+            self.import_progress = None
+
+    def refresh_after_import(self):
+        # Filter completers are built when FilterDialog opens, so they pick up
+        # the new values on their own; only the visible result needs reloading.
+        if self.showing_overview:
+            self.load_initial_data()
+        elif self.last_filters.get("from_ym") and self.last_filters.get("to_ym"):
+            self.load_filtered_data(self.last_cols, self.last_filters)
+        else:
+            self.load_initial_data()
 
     def open_filter_dialog(self):
         if not self.has_imported_data:
             QMessageBox.information(self, "Filtros", "Primero importa un TXT/CSV.")
             return
 
+        from driving_statistics.view.filtres import FilterDialog
+
         dlg = FilterDialog(
             self,
             initial={"cols": self.last_cols, "filters": self.last_filters}
         )
         if dlg.exec():
             cols, filters = dlg.get_filters()
+            self.filter_cols = cols
             self.load_filtered_data(cols, filters)
 
     def load_filtered_data(self, cols, filters):
-        if not cols:
-            cols = [k for k, _ in COLUMNS]
-
-        where = []
-        params = []
-
-        for k in ("province", "exam_center", "driving_school"):
-            if filters[k]:
-                where.append(f"{k} LIKE ?")
-                params.append(f"%{filters[k]}%")
-
-        if filters["exam_type"]:
-            where.append("exam_type LIKE ?")
-            params.append(f"%{filters['exam_type']}%")
-
-        where.append("(exam_month BETWEEN ? AND ? OR exam_month IS NULL OR exam_month = '')")
-        params += [filters["from_ym"], filters["to_ym"]]
-
-        group_by = filters.get("group_by", "")
-        limit_value = int(filters.get("limit") or 0)
-        headers_map = dict(COLUMNS)
-
-        sql = ""
-        render_cols = cols[:]
-        render_headers = [headers_map[k] for k in cols if k in headers_map]
-
-        if group_by:
-            metric_cols = [k for k in ("presented", "passed", "failed") if k in cols]
-            if not metric_cols:
-                metric_cols = ["presented", "passed", "failed"]
-            group_label = headers_map.get(group_by, group_by)
-            select_parts = [group_by]
-            for metric in metric_cols:
-                select_parts.append(f"SUM(COALESCE({metric}, 0)) AS {metric}")
-            render_cols = [group_by] + metric_cols
-            render_headers = [group_label] + [headers_map[m] for m in metric_cols]
-            sql = f"SELECT {', '.join(select_parts)} FROM exams"
-        else:
-            sql = f"SELECT {', '.join(cols)} FROM exams"
-
-        if where:
-            sql += " WHERE " + " AND ".join(where)
-        if group_by:
-            sql += f" GROUP BY {group_by} ORDER BY {group_by} ASC"
-        if limit_value > 0:
-            sql += " LIMIT ?"
-            params.append(limit_value)
-
-        rows = fetch(sql, params)
-        self.last_rows = rows
-        self.last_cols = render_cols
-        self.last_headers = render_headers
+        filters = normalize_filters(filters)
+        # A live query still running must not be shown over this result.
+        self.live_request_id += 1
+        self.showing_overview = False
+        misses = self.result_cache.stats()["misses"]
+        with profiler.profiled("ui.filter_query") as info:
+            result = self.result_cache.get(
+                filter_key(cols, filters),
+                lambda: run_filtered_query(cols, filters),
+            )
+            info["cached"] = self.result_cache.stats()["misses"] == misses
+        self.show_result(cols, filters, result)
+        if self.live_filter_panel is not None:
+            self.live_filter_panel.set_status(self._live_status(result))
+
+    def show_result(self, cols, filters, result):
+        self.last_sql = result["sql"]
+        self.last_params = result["params"]
+        self.last_cols = result["cols"]
+        self.last_headers = result["headers"]
         self.last_filters = filters
-        self.has_imported_data = len(rows) > 0
-
-        self.render_table(rows, render_cols, render_headers)
-        self.update_chart(rows, render_cols)
-
-    def render_table(self, rows, cols, headers=None):
-        self.table.setSortingEnabled(False)
-        self.table.setRowCount(len(rows))
-        self.table.setColumnCount(len(cols))
-        self.table.setHorizontalHeaderLabels(headers or [lbl for k, lbl in COLUMNS if k in cols])
-
-        for r, row in enumerate(rows):
-            for c, val in enumerate(row):
-                col_key = cols[c]
-                shown = self._format_value_for_table(col_key, val)
-                self.table.setItem(r, c, QTableWidgetItem(shown))
-        self.table.setSortingEnabled(True)
+
+        more = result["rows"] is None
+        self.render_table(
+            result["sql"], result["params"], result["cols"], result["headers"], result["head"], more
+        )
+        self.has_imported_data = self.table_model.rowCount() > 0
+        self.update_summary(result["totals"], result["metric_cols"])
+        self.update_chart(cols, filters)
+
+        stats = self.result_cache.stats()
+        self.statusBar().showMessage(f"Cache de filtros: {stats['hits']} aciertos, {stats['misses']} fallos")
+
+    def render_table(self, sql, params, cols, headers=None, rows=None, more=False):
+        # The model only reads the pages the view actually scrolls to.
+        with profiler.profiled("ui.render_table", columns=len(cols)) as info:
+            self.table.setSortingEnabled(False)
+            self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+            self.table_model.set_query(
+                sql, params, cols, headers or [lbl for k, lbl in COLUMNS if k in cols], rows, more
+            )
+            self.table.setSortingEnabled(True)
+            info["rows"] = self.table_model.rowCount()
 
     def _format_value_for_table(self, col_key, value):
         if value is None:
             return ""
 
+        if isinstance(value, float) and col_key.partition("@")[0] in RATE_METRICS:
+            return f"{value:.1%}"
+
         text = str(value).strip()
         if col_key != "exam_month" or not text:
             return text
@@ -180,19 +301,119 @@ class MainController(MainWindowUI):
             return f"{dd}/{mm}/{yyyy}"
         return text
 
-    def update_chart(self, rows, cols):
-        if getattr(self, "chart_placeholder", None) is not None:
-            self.chart_layout.removeWidget(self.chart_placeholder)
-            self.chart_placeholder.deleteLater()
-            self.chart_placeholder = None
+    def update_summary(self, rows, cols):
+        headers_map = dict(COLUMNS)
+        totals = summarize_totals(rows, cols)
+        parts = [f"{headers_map[k]}: {totals[k]}" for k in cols if k in totals]
+        if "pass_rate" in totals:
+            parts.append(f"% aptos: {totals['pass_rate']:.1%}")
+        self.summary_label.setText("  |  ".join(parts))
+
+    def update_chart(self, cols, filters):
+        # The chart is only built while its tab is showing.
+        self.pending_chart = (cols, filters)
+        if self.tabs.currentWidget() is self.chart_page:
+            self._build_pending_chart()
+
+    def _on_tab_changed(self, _index):
+        if self.tabs.currentWidget() is self.chart_page and self.pending_chart is not None:
+            self._build_pending_chart()
+
+    def _build_pending_chart(self):
+        cols, filters = self.pending_chart
+        self.pending_chart = None
+        with profiler.profiled("ui.chart") as info:
+            data = self.result_cache.get(
+                ("chart", filter_key(cols, filters)),
+                lambda: chart_data(cols, filters),
+            )
+            info["rows"] = len(data["months"]) + len(data["groups"])
+            self._show_chart(data)
+
+    def _show_chart(self, data):
+        if self.chart_widget is None:
+            from driving_statistics.services.charts import ExamChartsView
+
+            if getattr(self, "chart_placeholder", None) is not None:
+                self.chart_layout.removeWidget(self.chart_placeholder)
+                self.chart_placeholder.deleteLater()
+                self.chart_placeholder = None
+            self.chart_widget = ExamChartsView()
+            self.chart_layout.addWidget(self.chart_widget)
+        self.chart_widget.set_data(data)
+
+    def show_live_filter_panel(self):
+        if self.live_filter_panel is None:
+            from driving_statistics.view.live_filter_panel import LiveFilterPanel
+
+            overview = data_overview()
+            self.live_filter_panel = LiveFilterPanel(
+                self.last_filters, overview["first_month"], overview["last_month"], self
+            )
+            self.live_filter_panel.filters_changed.connect(self.run_live_query)
+            self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.live_filter_panel)
+        self.live_filter_panel.show()
+        self.live_filter_panel.raise_()
+
+    def run_live_query(self, filters):
+        # Each request gets a new id; results for older ids are dropped.
+        self.live_request_id += 1
+        cols = self.filter_cols
+        filters = normalize_filters(filters)
+        cached = self.result_cache.peek(filter_key(cols, filters))
+        if cached is not None:
+            self.showing_overview = False
+            self.show_result(cols, filters, cached)
+            self.live_filter_panel.set_status(self._live_status(cached))
+            return
 
-        if self.chart_widget is not None:
-            self.chart_layout.removeWidget(self.chart_widget)
-            self.chart_widget.deleteLater()
-            self.chart_widget = None
+        if self.query_worker is None:
+            self.query_worker = QueryWorker(self)
+            self.query_worker.result_ready.connect(self._on_live_result)
+            self.query_worker.failed.connect(self._on_live_failed)
+            self.query_worker.start()
+        self.query_worker.submit(self.live_request_id, cols, filters)
+        self.live_filter_panel.set_status("Buscando...")
 
-        self.chart_widget = build_chart_view(rows, cols)
-        self.chart_layout.addWidget(self.chart_widget)
+    def _on_live_result(self, request_id, payload):
+        if request_id != self.live_request_id:
+            return
+        cols, filters, result = payload
+        self.result_cache.put(filter_key(cols, filters), result)
+        self.showing_overview = False
+        self.show_result(cols, filters, result)
+        self.live_filter_panel.set_status(self._live_status(result))
+
+    def _on_live_failed(self, request_id, message):
+        if request_id == self.live_request_id:
+            self.live_filter_panel.set_status(f"Error: {message}")
+
+    def _live_status(self, result):
+        if result["rows"] is None:
+            return f"Mas de {len(result['head'])} filas: el resto se carga al desplazarse"
+        return f"{len(result['rows'])} filas"
+
+    def closeEvent(self, event):
+        # QThreads still running when the window is destroyed abort the app.
+        for worker in (self.import_worker, self.report_worker):
+            if worker is not None and worker.isRunning():
+                # No result or message boxes for a window that is closing.
+                worker.blockSignals(True)
+                worker.cancel()
+                worker.wait()
+        if self.query_worker is not None:
+            self.query_worker.stop()
+        self.table_model.close()
+        super().closeEvent(event)
+
+    def show_profiler_panel(self):
+        if self.profiler_panel is None:
+            from driving_statistics.view.profiler_panel import ProfilerPanel
+
+            self.profiler_panel = ProfilerPanel(self)
+            self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.profiler_panel)
+        self.profiler_panel.show()
+        self.profiler_panel.raise_()
 
     def export_pdf(self):
         if not self.last_cols:
@@ -209,25 +430,71 @@ class MainController(MainWindowUI):
         if not path.lower().endswith(".pdf"):
             path += ".pdf"
 
+        if mode == "report":
+            self.start_report(path)
+            return
+
+        from driving_statistics.services.reports import export_table_pdf
+
         try:
-            if mode == "table":
-                export_table_pdf(self.table, path)
-            else:
-                export_html_pdf(self.last_rows, self.last_cols, self.last_headers, path)
+            export_table_pdf(self.table, path)
             QMessageBox.information(self, "PDF", "PDF generado correctamente.")
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def start_report(self, path):
+        self.report_progress = self._make_progress_dialog("Generar PDF", "Generando informe...")
+        self.report_worker = ReportWorker(
+            self.last_sql, self.last_params, self.last_cols, self.last_headers, path,
+            formatter=self._format_value_for_table, parent=self,
+        )
+        self.report_worker.progress.connect(self._on_report_progress)
+        self.report_worker.succeeded.connect(self._on_report_succeeded)
+        self.report_worker.failed.connect(self._on_report_failed)
+        self.report_worker.cancelled.connect(self._on_report_cancelled)
+        self.report_worker.finished.connect(self._on_report_finished)
+        self.report_progress.canceled.connect(self.report_worker.cancel)
+        self.report_worker.start()
+        self.report_progress.show()
+
+    def _on_report_progress(self, done, total):
+        if self.report_progress is not None:
+            self.report_progress.setMaximum(total)
+            self.report_progress.setValue(done)
+            self.report_progress.setLabelText(f"Filas escritas: {done} de {total}")
+
+    def _on_report_succeeded(self, stats):
+        self._close_report_progress()
+        QMessageBox.information(self, "PDF", f"PDF generado correctamente ({stats['pages']} paginas).")
+
+    def _on_report_failed(self, message):
+        self._close_report_progress()
+        QMessageBox.critical(self, "Error", message)
+
+    def _on_report_cancelled(self):
+        self._close_report_progress()
+        QMessageBox.information(self, "PDF", "Generacion del PDF cancelada.")
+
+    def _on_report_finished(self):
+        self.report_worker.deleteLater()
+        self.report_worker = None
+
+    def _close_report_progress(self):
+        if self.report_progress is not None:
+            self.report_progress.close()
+            self.report_progress.deleteLater()
+            self.report_progress = None
+
     def _select_pdf_mode(self):
         dlg = QDialog(self)
         dlg.setWindowTitle("Generar PDF")
         layout = QVBoxLayout(dlg)
 
         opt_table = QRadioButton("Imprimir tabla (como captura)")
-        opt_html = QRadioButton("Generar HTML e imprimir (todas las filas)")
-        opt_html.setChecked(True)
+        opt_report = QRadioButton("Generar informe paginado (todas las filas)")
+        opt_report.setChecked(True)
         layout.addWidget(opt_table)
-        layout.addWidget(opt_html)
+        layout.addWidget(opt_report)
 
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         buttons.accepted.connect(dlg.accept)
@@ -236,6 +503,6 @@ class MainController(MainWindowUI):
 
         if dlg.exec() != QDialog.DialogCode.Accepted:
             return None
-        return "table" if opt_table.isChecked() else "html"
+        return "table" if opt_table.isChecked() else "report"
 
 
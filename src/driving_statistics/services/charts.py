@@ -1,68 +1,137 @@
-# Preparado para futuras gráficas (QtCharts)
-from PyQt6.QtCharts import QChart, QChartView, QBarSeries, QBarSet, QBarCategoryAxis, QValueAxis
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPainter, QCursor
-from PyQt6.QtWidgets import QToolTip
-
-
-def build_chart_view(rows, cols):
-    labels = {
-        "presented": "Presentados",
-        "passed": "Aptos",
-        "failed": "No aptos",
-    }
-
-    sums = {}
-    for key in ("presented", "passed", "failed"):
-        if key in cols:
-            idx = cols.index(key)
-            total = 0
-            for row in rows:
-                val = row[idx]
-                if val is None or val == "":
-                    continue
-                total += int(val)
-            sums[key] = total
-
-    chart = QChart()
-    chart.setTitle("Totales del filtro")
-    chart.setAnimationOptions(QChart.AnimationOption.SeriesAnimations)
-
-    categories = [labels[k] for k in ("presented", "passed", "failed") if k in sums]
-    if categories:
-        series = QBarSeries()
-        bar_set = QBarSet("Total")
-        values = [sums[k] for k in ("presented", "passed", "failed") if k in sums]
-        bar_set.append(values)
-        series.append(bar_set)
-        chart.addSeries(series)
-
-        axis_x = QBarCategoryAxis()
-        axis_x.append(categories)
-        chart.addAxis(axis_x, Qt.AlignmentFlag.AlignBottom)
-        series.attachAxis(axis_x)
-
-        axis_y = QValueAxis()
-        axis_y.setTitleText("Cantidad")
-        axis_y.setMin(0)
-        chart.addAxis(axis_y, Qt.AlignmentFlag.AlignLeft)
-        series.attachAxis(axis_y)
-
-        def _on_hovered(status, index, bar_set_ref=bar_set, cats=categories):
-            if not status:
-                QToolTip.hideText()
-                return
-            try:
-                val = int(bar_set_ref.at(index))
-            except Exception:
-                val = bar_set_ref.at(index)
-            label = cats[index] if 0 <= index < len(cats) else "Valor"
-            QToolTip.showText(QCursor.pos(), f"{label}: {val}")
-
-        bar_set.hovered.connect(_on_hovered)
-    else:
-        chart.setTitle("Sin datos para graficar")
-
-    view = QChartView(chart)
-    view.setRenderHint(QPainter.RenderHint.Antialiasing)
-    return view
+from PyQt6.QtCharts import (
+    QBarCategoryAxis, QBarSeries, QBarSet, QChart, QChartView, QDateTimeAxis, QLineSeries, QValueAxis)
+from PyQt6.QtCore import QDate, QDateTime, QPointF, Qt, QTime
+from PyQt6.QtGui import QCursor, QPainter
+from PyQt6.QtWidgets import QToolTip, QVBoxLayout, QWidget
+from driving_statistics.services.database import COLUMNS
+from driving_statistics.services.queries import summarize_totals
+
+LABELS = {
+    "presented": "Presentados",
+    "passed": "Aptos",
+    "failed": "No aptos",
+}
+METRICS = ("presented", "passed", "failed")
+
+
+def _month_msecs(month):
+    try:
+        year, mm = str(month).split("-")[:2]
+        date = QDate(int(year), int(mm), 1)
+    except ValueError:
+        return None
+    if not date.isValid():
+        return None
+    return float(QDateTime(date, QTime(0, 0)).toMSecsSinceEpoch())
+
+
+def _show_bar_tooltip(status, index, bar_set, categories):
+    if not status:
+        QToolTip.hideText()
+        return
+    try:
+        val = int(bar_set.at(index))
+    except Exception:
+        val = bar_set.at(index)
+    label = categories[index] if 0 <= index < len(categories) else "Valor"
+    QToolTip.showText(QCursor.pos(), f"{bar_set.label()} - {label}: {val}")
+
+
+class ExamChartsView(QWidget):
+    """Month series and bar chart that are created once and updated in place."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+
+        self.time_chart = QChart()
+        self.time_chart.setTitle("Evolucion mensual")
+        self.time_chart.setAnimationOptions(QChart.AnimationOption.NoAnimation)
+        self.lines = {}
+        self.time_axis = QDateTimeAxis()
+        self.time_axis.setFormat("MM/yyyy")
+        self.time_value_axis = QValueAxis()
+        self.time_value_axis.setTitleText("Cantidad")
+        self.time_chart.addAxis(self.time_axis, Qt.AlignmentFlag.AlignBottom)
+        self.time_chart.addAxis(self.time_value_axis, Qt.AlignmentFlag.AlignLeft)
+        for key in METRICS:
+            series = QLineSeries()
+            series.setName(LABELS[key])
+            self.time_chart.addSeries(series)
+            series.attachAxis(self.time_axis)
+            series.attachAxis(self.time_value_axis)
+            self.lines[key] = series
+
+        self.bar_chart = QChart()
+        self.bar_chart.setAnimationOptions(QChart.AnimationOption.NoAnimation)
+        self.bar_series = QBarSeries()
+        self.bar_sets = {}
+        for key in METRICS:
+            bar_set = QBarSet(LABELS[key])
+            bar_set.hovered.connect(
+                lambda status, index, b=bar_set: _show_bar_tooltip(status, index, b, self.bar_axis.categories())
+            )
+            self.bar_sets[key] = bar_set
+        self.bar_chart.addSeries(self.bar_series)
+        self.bar_axis = QBarCategoryAxis()
+        self.bar_value_axis = QValueAxis()
+        self.bar_value_axis.setTitleText("Cantidad")
+        self.bar_chart.addAxis(self.bar_axis, Qt.AlignmentFlag.AlignBottom)
+        self.bar_chart.addAxis(self.bar_value_axis, Qt.AlignmentFlag.AlignLeft)
+        self.bar_series.attachAxis(self.bar_axis)
+        self.bar_series.attachAxis(self.bar_value_axis)
+
+        for chart in (self.time_chart, self.bar_chart):
+            view = QChartView(chart)
+            view.setRenderHint(QPainter.RenderHint.Antialiasing)
+            layout.addWidget(view)
+
+    def set_data(self, data):
+        self._set_months(data["months"])
+        if data["groups"]:
+            self._set_groups(data["group_cols"], data["groups"])
+        else:
+            self._set_totals(data["totals"], data["metric_cols"])
+
+    def _set_months(self, months):
+        points = [(_month_msecs(r[0]), r[1:]) for r in months]
+        points = [(x, values) for x, values in points if x is not None]
+        top = 0
+        for i, key in enumerate(METRICS):
+            series_points = [QPointF(x, values[i] or 0) for x, values in points]
+            # replace() swaps the whole point list with a single repaint.
+            self.lines[key].replace(series_points)
+            top = max([top] + [p.y() for p in series_points])
+        if points:
+            self.time_axis.setRange(
+                QDateTime.fromMSecsSinceEpoch(int(points[0][0])),
+                QDateTime.fromMSecsSinceEpoch(int(points[-1][0])),
+            )
+        self.time_value_axis.setRange(0, top or 1)
+
+    def _set_bars(self, categories, values_by_metric):
+        for key, bar_set in self.bar_sets.items():
+            values = values_by_metric.get(key)
+            attached = bar_set in self.bar_series.barSets()
+            if values is None:
+                if attached:
+                    self.bar_series.take(bar_set)
+                continue
+            if bar_set.count():
+                bar_set.remove(0, bar_set.count())
+            bar_set.append([float(v) for v in values])
+            if not attached:
+                self.bar_series.append(bar_set)
+        self.bar_axis.setCategories(categories)
+        top = max([0] + [v for values in values_by_metric.values() for v in values])
+        self.bar_value_axis.setRange(0, top or 1)
+
+    def _set_totals(self, rows, cols):
+        sums = {k: v for k, v in summarize_totals(rows, cols).items() if k in METRICS}
+        self.bar_chart.setTitle("Totales del filtro" if sums else "Sin datos para graficar")
+        self._set_bars(["Total"], {k: [v] for k, v in sums.items()})
+
+    def _set_groups(self, cols, rows):
+        self.bar_chart.setTitle(f"Totales por {dict(COLUMNS).get(cols[0], cols[0]).lower()}")
+        values = {k: [r[i] or 0 for r in rows] for i, k in enumerate(cols) if k in METRICS}
+        self._set_bars([str(r[0]) for r in rows], values)
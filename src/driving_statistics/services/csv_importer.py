@@ -1,8 +1,59 @@
+import codecs
 import csv
-from driving_statistics.services.database import get_connection
+import io
+import mmap
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+import warnings
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from driving_statistics.services import import_ledger, profiler
+from driving_statistics.services.database import (
+    get_connection, record_inserted_rows, max_exam_id, update_derived_tables)
+from driving_statistics.services.partitions import sealed_years
+
+# Tried in order on the samples; a UTF-8 BOM picks utf-8-sig directly.
+ENCODINGS = ("utf-8", "cp1252")
+DECODE_ERRORS = "exam_fallback"
+DELIMITERS = ",;\t|"
+SAMPLE_SIZE = 64 * 1024
+SNIFF_LINES = 50
+DATA_SUFFIXES = (".txt", ".csv")
+BATCH_SIZE = 5000
+# Rows between commits; an interrupted import resumes from the last one.
+CHECKPOINT_ROWS = 100000
+PANDAS_CHUNK_ROWS = 100000
+# Fields a row may have past the first line's; the pandas engine skips longer
+# rows with a warning (each one costs a column per chunk).
+PANDAS_EXTRA_FIELDS = 4
+# "pandas" parses with the vectorised reader; pandas is imported only then.
+DEFAULT_ENGINE = "python"
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+INSERT_SQL = """
+    INSERT OR IGNORE INTO exams
+    (province, exam_center, exam_type, driving_school, exam_month,
+     presented, passed, failed)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 
 def to_int(v):
+    # Plain integers take the fast path; separators and junk fall back.
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        pass
     try:
         return int(str(v).replace(".", "").replace(",", "").strip())
     except Exception:
@@ -17,95 +68,670 @@ def _header_map(header):
     return {_norm(name): idx for idx, name in enumerate(header)}
 
 
-def _cell(row, hmap, *names):
-    for name in names:
-        idx = hmap.get(_norm(name))
-        if idx is not None and idx < len(row):
-            return str(row[idx]).strip()
-    return ""
+# Accepted header names per field, in order of preference.
+FIELD_NAMES = {
+    "province": ("province", "provincia", "desc_provincia"),
+    "exam_center": ("exam_center", "centro", "centro_examen"),
+    "driving_school": ("driving_school", "autoescuela", "nombre_autoescuela"),
+    "exam_type": ("exam_type", "tipo_examen"),
+    "permit": ("nombre_permiso",),
+    "month": ("mes", "exam_month"),
+    "year": ("anyo", "año", "year"),
+    "passed": ("passed", "aptos", "num_aptos"),
+    "failed": ("failed", "no aptos", "num_no_aptos"),
+    "presented": ("presented", "presentados"),
+}
+HEADER_HINTS = ("provincia", "desc_provincia", "centro_examen", "nombre_autoescuela")
+# Files without a header: province, center, type, school, month, presented, passed, failed.
+POSITIONAL_PLAN = {
+    "province": (0,),
+    "exam_center": (1,),
+    "exam_type": (2,),
+    "driving_school": (3,),
+    "permit": (),
+    "month": (4,),
+    "year": (),
+    "passed": (6,),
+    "failed": (7,),
+    "presented": (5,),
+    "presented_rule": "column",
+}
 
 
-def read_text_rows(path):
-    for enc in ("utf-8", "utf-8-sig", "cp1252", "latin-1"):
-        try:
-            with open(path, encoding=enc, newline="") as f:
-                sample = f.read(4096)
-                f.seek(0)
-                dialect = csv.Sniffer().sniff(sample, ",;\t|")
-                return list(csv.reader(f, dialect))
-        except Exception:
-            pass
-    raise ValueError("No se pudo leer el archivo")
-
-
-def save_csv_to_db(path):
-    rows = read_text_rows(path)
-    if not rows:
+def _is_header(row):
+    return any(key in _norm(" ".join(row)) for key in HEADER_HINTS)
+
+
+def column_plan(header):
+    """Resolve the header once into the column indices of every field."""
+    hmap = _header_map(header)
+    plan = {field: tuple(hmap[name] for name in names if name in hmap) for field, names in FIELD_NAMES.items()}
+    # DGT exports have no presented column; it is derived from aptos + no aptos.
+    if "num_aptos" in hmap or "num_no_aptos" in hmap:
+        plan["presented_rule"] = "sum"
+    else:
+        plan["presented_rule"] = "column_or_sum"
+    return plan
+
+
+def _getter(indices):
+    # Later indices are only used when a short row lacks the first one.
+    if not indices:
+        return lambda r: ""
+    if len(indices) == 1:
+        idx = indices[0]
+        return lambda r: r[idx].strip() if idx < len(r) else ""
+
+    def get(r):
+        for idx in indices:
+            if idx < len(r):
+                return r[idx].strip()
+        return ""
+    return get
+
+
+def record_mapper(plan):
+    """Compile `plan` into a function turning a parsed row into an exams record."""
+    province = _getter(plan["province"])
+    exam_center = _getter(plan["exam_center"])
+    driving_school = _getter(plan["driving_school"])
+    exam_type = _getter(plan["exam_type"])
+    permit = _getter(plan["permit"]) if plan["permit"] else None
+    month = _getter(plan["month"])
+    year = _getter(plan["year"]) if plan["year"] else None
+    passed = _getter(plan["passed"])
+    failed = _getter(plan["failed"])
+    presented = _getter(plan["presented"])
+    rule = plan["presented_rule"]
+
+    def record(r):
+        kind = exam_type(r)
+        if permit is not None:
+            extra = permit(r)
+            if extra:
+                kind = f"{kind} {extra}".strip()
+        mm = month(r)
+        yyyy = year(r) if year is not None else ""
+        passed_n = to_int(passed(r))
+        failed_n = to_int(failed(r))
+        if rule == "sum":
+            presented_n = passed_n + failed_n
+        elif rule == "column":
+            presented_n = to_int(presented(r))
+        else:
+            raw = presented(r)
+            presented_n = to_int(raw) if raw else passed_n + failed_n
+        return (
+            province(r),
+            exam_center(r),
+            kind,
+            driving_school(r),
+            f"{yyyy}-{mm.zfill(2)}" if yyyy and mm else mm,
+            presented_n,
+            passed_n,
+            failed_n,
+        )
+    return record
+
+
+@contextmanager
+def open_source(source):
+    # A source is a file path or a (zip_path, member) pair.
+    if isinstance(source, tuple):
+        zip_path, member = source
+        with zipfile.ZipFile(zip_path) as zf, zf.open(member) as f:
+            yield f
+    else:
+        with open(source, "rb") as f:
+            yield f
+
+
+def _decode_fallback(err):
+    # Bytes that do not fit the detected encoding are read as cp1252, or as
+    # latin-1 for the few bytes cp1252 leaves undefined, instead of failing.
+    bad = err.object[err.start:err.end]
+    try:
+        return bad.decode("cp1252"), err.end
+    except UnicodeDecodeError:
+        return bad.decode("latin-1"), err.end
+
+
+codecs.register_error(DECODE_ERRORS, _decode_fallback)
+
+
+def _samples(source):
+    """Head, middle and tail of a file, read through mmap without a full scan.
+
+    ZIP members cannot be mapped, so only their head is sampled. Returns
+    the samples and whether the last one ends at the end of the file.
+    """
+    if isinstance(source, tuple):
+        with open_source(source) as f:
+            head = f.read(SAMPLE_SIZE)
+        return [head], len(head) < SAMPLE_SIZE
+    with open(source, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= 3 * SAMPLE_SIZE:
+            return [f.read()], True
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            middle = size // 2
+            return [mm[:SAMPLE_SIZE], mm[middle:middle + SAMPLE_SIZE], mm[-SAMPLE_SIZE:]], True
+
+
+def _decodes(sample, encoding, first, last):
+    if encoding == "utf-8" and not first:
+        # A sample cut from the middle may start inside a multi-byte character.
+        start = 0
+        while start < 3 and start < len(sample) and 0x80 <= sample[start] <= 0xBF:
+            start += 1
+        sample = sample[start:]
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=last)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _sniff_dialect(sample):
+    lines = sample.splitlines()[:SNIFF_LINES]
+    try:
+        return csv.Sniffer().sniff("\n".join(lines), DELIMITERS)
+    except csv.Error:
+        pass
+    # Sniffer gives up on ragged rows; fall back to the header's most common separator.
+    counts = {d: lines[0].count(d) for d in DELIMITERS} if lines else {}
+    best = max(DELIMITERS, key=lambda d: counts.get(d, 0))
+    if not counts.get(best):
+        return csv.excel
+
+    class Guessed(csv.excel):
+        delimiter = best
+    return Guessed
+
+
+def detect_format(source):
+    """Encoding and CSV dialect of `source`, from bounded samples only."""
+    samples, at_end = _samples(source)
+    head = samples[0]
+    if head.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        # A sample cut before the end may stop inside a multi-byte character.
+        encoding = next(
+            (
+                enc for enc in ENCODINGS
+                if all(
+                    _decodes(s, enc, i == 0, at_end and i == len(samples) - 1)
+                    for i, s in enumerate(samples)
+                )
+            ),
+            "latin-1",
+        )
+    text = head.decode(encoding, errors=DECODE_ERRORS)
+    if len(head) == SAMPLE_SIZE:
+        # Only complete lines are sniffed.
+        text = text[:text.rfind("\n") + 1] or text
+    return encoding, _sniff_dialect(text)
+
+
+class _HashingReader(io.RawIOBase):
+    """Raw stream feeding every byte read from `f` to `hasher`."""
+
+    def __init__(self, f, hasher):
+        self._f = f
+        self._hasher = hasher
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._f.readinto(b)
+        if n:
+            self._hasher.update(memoryview(b)[:n])
+        return n
+
+
+@contextmanager
+def open_text(source, hasher=None):
+    """Yield (text stream, dialect) decoding `source` in a single pass.
+
+    With `hasher`, the raw bytes are hashed as they are decoded, and any
+    left unread when the caller is done are hashed too.
+    """
+    encoding, dialect = detect_format(source)
+    with open_source(source) as raw:
+        if hasher is not None:
+            raw = io.BufferedReader(_HashingReader(raw, hasher), import_ledger.HASH_CHUNK)
+        yield io.TextIOWrapper(raw, encoding=encoding, errors=DECODE_ERRORS, newline=""), dialect
+        if hasher is not None:
+            while raw.read(import_ledger.HASH_CHUNK):
+                pass
+
+
+def iter_text_rows(source, hasher=None):
+    with open_text(source, hasher) as (f, dialect):
+        yield from csv.reader(f, dialect)
+
+
+def iter_exam_records(source, hasher=None):
+    rows = iter_text_rows(source, hasher)
+    first_row = next(rows, None)
+    if first_row is None:
         return
 
-    first_row = rows[0]
-    has_header = any(
-        key in _norm(" ".join(first_row))
-        for key in ("provincia", "desc_provincia", "centro_examen", "nombre_autoescuela")
+    if _is_header(first_row):
+        record = record_mapper(column_plan(first_row))
+    else:
+        record = record_mapper(POSITIONAL_PLAN)
+        rows = _chain_first(first_row, rows)
+
+    for r in rows:
+        if not any(x.strip() for x in r):
+            continue
+        yield record(r)
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+
+def _int_list(values):
+    # Plain integers convert in one pass; any other value sends the column to to_int.
+    try:
+        return [int(v) for v in values]
+    except ValueError:
+        return [to_int(v) for v in values]
+
+
+def _frame_records(frame, plan):
+    """Exams records from a chunk whose columns are the row fields, by position.
+
+    The C reader has already split the rows; each column is then mapped as
+    one list, the same way record_mapper maps a single row.
+    """
+    planned = {i for field in FIELD_NAMES for i in plan[field]}
+    columns = {idx: [v.strip() for v in frame[idx].tolist()] for idx in frame.columns if idx in planned}
+    if not columns:
+        return []
+    # A row is blank only if every column read is empty, so start from the first one.
+    first = next(iter(columns.values()))
+    blank = [i for i, v in enumerate(first) if not v]
+    blank = [i for i in blank if not any(col[i] for col in columns.values())]
+    if blank:
+        dropped = set(blank)
+        columns = {
+            idx: [v for i, v in enumerate(col) if i not in dropped] for idx, col in columns.items()
+        }
+    size = len(next(iter(columns.values())))
+    if not size:
+        return []
+
+    def text(field):
+        idx = next((i for i in plan[field] if i in columns), None)
+        return columns[idx] if idx is not None else [""] * size
+
+    kind = text("exam_type")
+    permit = text("permit")
+    if any(permit):
+        kind = [f"{k} {p}".strip() if p else k for k, p in zip(kind, permit)]
+    exam_month = [
+        f"{y}-{m.zfill(2)}" if y and m else m for y, m in zip(text("year"), text("month"))
+    ]
+    passed = _int_list(text("passed"))
+    failed = _int_list(text("failed"))
+    if plan["presented_rule"] == "sum":
+        presented = [p + f for p, f in zip(passed, failed)]
+    elif plan["presented_rule"] == "column":
+        presented = _int_list(text("presented"))
+    else:
+        raw = text("presented")
+        presented = [
+            to_int(r) if r else p + f for r, p, f in zip(raw, passed, failed)
+        ]
+
+    return zip(
+        text("province"),
+        text("exam_center"),
+        kind,
+        text("driving_school"),
+        exam_month,
+        presented,
+        passed,
+        failed,
     )
-    data = rows[1:] if has_header else rows
-    hmap = _header_map(first_row) if has_header else {}
-
-    sql = """
-        INSERT OR IGNORE INTO exams
-        (province, exam_center, exam_type, driving_school, exam_month,
-         presented, passed, failed)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+
+
+class _Prefixed:
+    """Text stream returning `prefix` before the rest of `f`, for the C reader."""
+
+    def __init__(self, prefix, f):
+        self._prefix = prefix
+        self._f = f
+
+    def read(self, size=-1):
+        head, self._prefix = self._prefix, ""
+        if size is None or size < 0:
+            return head + self._f.read()
+        if len(head) >= size > 0:
+            return head
+        return head + self._f.read(size - len(head))
+
+    def __iter__(self):
+        return iter(self.read().splitlines(True))
+
+
+def iter_exam_records_pandas(source, chunk_rows=PANDAS_CHUNK_ROWS, hasher=None):
+    """Same records as `iter_exam_records`, parsed by the pandas C reader in chunks.
+
+    The fields up to the last planned one are read by position: short rows
+    get empty trailing fields and the extra fields of longer rows are
+    ignored, as record_mapper treats them. Lines pandas cannot tokenise, or
+    with over PANDAS_EXTRA_FIELDS fields more than the first line, are
+    skipped with a warning instead of aborting the import.
     """
+    import pandas as pd
 
-    with get_connection() as conn:
-        cur = conn.cursor()
-        for r in data:
-            if not any(str(x).strip() for x in r):
-                continue
-
-            if hmap:
-                province = _cell(r, hmap, "province", "provincia", "desc_provincia")
-                exam_center = _cell(r, hmap, "exam_center", "centro", "centro_examen")
-                driving_school = _cell(r, hmap, "driving_school", "autoescuela", "nombre_autoescuela")
-                exam_type = _cell(r, hmap, "exam_type", "tipo_examen")
-                permiso = _cell(r, hmap, "nombre_permiso")
-                if permiso:
-                    exam_type = f"{exam_type} {permiso}".strip()
-
-                month = _cell(r, hmap, "mes", "exam_month")
-                year = _cell(r, hmap, "anyo", "año", "year")
-                exam_month = f"{year}-{month.zfill(2)}" if year and month else month
-
-                # DGT export: presented is not explicit; derive from aptos + no aptos.
-                passed = to_int(_cell(r, hmap, "passed", "aptos", "num_aptos"))
-                failed = to_int(_cell(r, hmap, "failed", "no aptos", "num_no_aptos"))
-                has_dgt_counts = (
-                    _norm("num_aptos") in hmap or _norm("num_no_aptos") in hmap
-                )
-                if has_dgt_counts:
-                    presented = passed + failed
-                else:
-                    presented_raw = _cell(r, hmap, "presented", "presentados")
-                    presented = to_int(presented_raw) if presented_raw else (passed + failed)
+    with open_text(source, hasher) as (f, dialect):
+        # The first line decides the plan, and with it the columns to read.
+        first_row = next(csv.reader([f.readline()], dialect), [])
+        if _is_header(first_row):
+            plan = column_plan(first_row)
+        else:
+            plan = POSITIONAL_PLAN
+            if any(x.strip() for x in first_row):
+                yield record_mapper(plan)(first_row)
+        width = max((i + 1 for field in FIELD_NAMES for i in plan[field]), default=0)
+        if not width:
+            return
+        # The C reader takes its row width from the first line, and with
+        # index_col=False pads shorter rows and cuts longer ones to `names`.
+        # A blank line that wide goes first; blank rows are dropped later.
+        fields = max(width, len(first_row)) + PANDAS_EXTRA_FIELDS
+        wide_line = dialect.delimiter * (fields - 1) + "\n"
+        reader = pd.read_csv(
+            _Prefixed(wide_line, f), sep=dialect.delimiter, quotechar=dialect.quotechar,
+            header=None, names=range(width), index_col=False, dtype=object, na_filter=False,
+            skip_blank_lines=True, chunksize=chunk_rows, engine="c", on_bad_lines="warn",
+        )
+        while True:
+            with warnings.catch_warnings():
+                # Cutting rows to `names` is the point; say nothing about it.
+                warnings.filterwarnings("ignore", "Length of header or names", pd.errors.ParserWarning)
+                chunk = next(reader, None)
+            if chunk is None:
+                return
+            yield from _frame_records(chunk, plan)
+
+
+ENGINES = {
+    "python": iter_exam_records,
+    "pandas": iter_exam_records_pandas,
+}
+
+
+def exam_records(source, engine=DEFAULT_ENGINE, hasher=None):
+    # `hasher` receives the file's bytes, so the digest comes from the same read.
+    return ENGINES[engine](source, hasher=hasher)
+
+
+def iter_batches(records, size=BATCH_SIZE):
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _progress_tick(progress, counts):
+    # A progress call with the current counts, so ImportCancelled can stop
+    # the passes that read a file before writing it.
+    if progress is None:
+        return None
+    return lambda: progress(counts["parsed"], counts["inserted"])
+
+
+def _tune_for_import(conn):
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+
+def source_digest(source, tick=None):
+    with open_source(source) as f:
+        return import_ledger.file_digest(f, tick)
+
+
+def _commit_checkpoint(conn, digest, source, start_id, rows_done, inserted, prints=None, complete=False):
+    update_derived_tables(conn, start_id)
+    if inserted:
+        record_inserted_rows(conn, inserted)
+    import_ledger.checkpoint(conn, digest, source, rows_done, prints, complete)
+    conn.commit()
+    return max_exam_id(conn)
+
+
+def _write_source(conn, source, digest, records, counts, batch_size=BATCH_SIZE, progress=None, prints=None):
+    """Insert the records of one file, committing every `CHECKPOINT_ROWS`.
+
+    Files already in the ledger as complete are skipped, and a partial one
+    resumes after its last checkpoint. When the (month, province) prints of
+    the file are known up front, partitions another file already brought in
+    with the same rows are not inserted again; anything else goes to
+    INSERT OR IGNORE. Rows for archived years are skipped: those files are
+    read-only.
+    """
+    state = import_ledger.lookup(conn, digest)
+    if state and state[1]:
+        counts["skipped_files"] += 1
+        return
+    rows_done = state[0] if state else 0
+    unchanged = import_ledger.unchanged_partitions(conn, digest, prints) if prints else set()
+    if prints is None:
+        # Collected while writing, for the files imported after this one.
+        prints = {}
+        records = import_ledger.fingerprinted(records, prints)
+    sealed = sealed_years(conn)
+    start_id = max_exam_id(conn)
+    cur = conn.cursor()
+    pending = 0
+    inserted = 0
+    for batch in iter_batches(islice(records, rows_done, None), batch_size):
+        rows_done += len(batch)
+        pending += len(batch)
+        counts["parsed"] += len(batch)
+        if unchanged or sealed:
+            fresh = [
+                r for r in batch
+                if import_ledger.partition_key(r) not in unchanged and (r[4] or "")[:4] not in sealed
+            ]
+            counts["skipped_rows"] += len(batch) - len(fresh)
+            batch = fresh
+        if batch:
+            cur.executemany(INSERT_SQL, batch)
+            # rowcount leaves out duplicates ignored by the unique index.
+            counts["inserted"] += cur.rowcount
+            inserted += cur.rowcount
+        if progress:
+            progress(counts["parsed"], counts["inserted"])
+        if pending >= CHECKPOINT_ROWS:
+            start_id = _commit_checkpoint(conn, digest, source, start_id, rows_done, inserted)
+            pending, inserted = 0, 0
+    _commit_checkpoint(conn, digest, source, start_id, rows_done, inserted, prints, complete=True)
+
+
+def _import_stats(counts, start, **extra):
+    seconds = time.perf_counter() - start
+    return {
+        **extra,
+        **counts,
+        "seconds": seconds,
+        "rows_per_sec": counts["parsed"] / seconds if seconds > 0 else 0.0,
+    }
+
+
+def save_csv_to_db(path, batch_size=BATCH_SIZE, progress=None, engine=DEFAULT_ENGINE):
+    """Stream `path` into `exams`, committing a checkpoint every `CHECKPOINT_ROWS`.
+
+    `progress(parsed, inserted)` is called after every batch, also while
+    the file is read before writing; raising `ImportCancelled` from it
+    rolls back to the last checkpoint, and
+    importing the same file again resumes from there. Returns a dict with
+    the row counts, elapsed seconds and rows per second.
+    """
+    counts = dict(parsed=0, inserted=0, skipped_rows=0, skipped_files=0)
+    start = time.perf_counter()
+    tick = _progress_tick(progress, counts)
+
+    conn = get_connection()
+    spool = None
+    try:
+        _tune_for_import(conn)
+        if import_ledger.has_partitions(conn):
+            # The partition prints are needed before writing: one read of the
+            # file hashes it, parses it and spools the records for the writer.
+            hasher = import_ledger.digest_hasher()
+            prints = {}
+            records = import_ledger.fingerprinted(exam_records(path, engine, hasher), prints)
+            spool = _spool_records(records, tick)
+            digest = hasher.hexdigest()
+            records = _spooled_records(spool)
+        else:
+            digest = source_digest(path, tick)
+            records, prints = exam_records(path, engine), None
+        _write_source(conn, path, digest, records, counts, batch_size, progress, prints)
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        if spool is not None:
+            Path(spool).unlink(missing_ok=True)
+
+    stats = _import_stats(counts, start)
+    profiler.record("import.file", stats["seconds"], source=str(path), rows=counts["parsed"],
+                    inserted=counts["inserted"], skipped_rows=counts["skipped_rows"], engine=engine)
+    return stats
+
+
+def collect_sources(path):
+    path = Path(path)
+    if path.is_dir():
+        return [
+            str(p) for p in sorted(path.rglob("*"))
+            if p.is_file() and p.suffix.lower() in DATA_SUFFIXES
+        ]
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            return [
+                (str(path), name) for name in sorted(zf.namelist())
+                if not name.endswith("/") and Path(name).suffix.lower() in DATA_SUFFIXES
+            ]
+    return [str(path)]
+
+
+def parse_source(source, engine=DEFAULT_ENGINE):
+    """Parse one file into a temporary spool of pickled record batches.
+
+    Runs in a worker process. Only one batch is held in memory at a time on
+    either side; returns the spool path and the partition prints.
+    """
+    prints = {}
+    records = import_ledger.fingerprinted(exam_records(source, engine), prints)
+    return _spool_records(records), prints
+
+
+def _spool_records(records, tick=None):
+    # Pickled batches in a temporary file, removed here if parsing fails.
+    with tempfile.NamedTemporaryFile("wb", prefix="exams_", suffix=".spool", delete=False) as f:
+        try:
+            for batch in iter_batches(records):
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                if tick:
+                    tick()
+        except BaseException:
+            f.close()
+            Path(f.name).unlink(missing_ok=True)
+            raise
+    return f.name
+
+
+def _spooled_records(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def _remove_spools(futures):
+    # Spools parsed but never written, after a cancel or an error.
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            Path(future.result()[0]).unlink(missing_ok=True)
+
+
+def import_sources(sources, batch_size=BATCH_SIZE, progress=None, workers=None, engine=DEFAULT_ENGINE):
+    """Parse `sources` in a process pool and write them from this process.
+
+    Files are parsed in parallel into temporary spools and written one
+    after another by a single connection, batch by batch, each with its own
+    ledger checkpoints. Files the ledger already has as complete are never
+    sent to the pool.
+    """
+    counts = dict(parsed=0, inserted=0, skipped_rows=0, skipped_files=0)
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    tick = _progress_tick(progress, counts)
+
+    conn = get_connection()
+    # Forking a process that runs Qt threads can deadlock the child.
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    in_flight = {}
+    try:
+        _tune_for_import(conn)
+        pending_sources = []
+        for source in sources:
+            digest = source_digest(source, tick)
+            state = import_ledger.lookup(conn, digest)
+            if state and state[1]:
+                counts["skipped_files"] += 1
             else:
-                r += [""] * (8 - len(r))
-                province = r[0].strip()
-                exam_center = r[1].strip()
-                exam_type = r[2].strip()
-                driving_school = r[3].strip()
-                exam_month = r[4].strip()
-                presented = to_int(r[5])
-                passed = to_int(r[6])
-                failed = to_int(r[7])
-
-            cur.execute(sql, (
-                province,
-                exam_center,
-                exam_type,
-                driving_school,
-                exam_month,
-                presented,
-                passed,
-                failed,
-            ))
+                pending_sources.append((source, digest))
+        # Keep a bounded number of parsed files waiting for the writer.
+        while pending_sources or in_flight:
+            while pending_sources and len(in_flight) < workers * 2:
+                source, digest = pending_sources.pop(0)
+                in_flight[pool.submit(parse_source, source, engine)] = (source, digest)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                source, digest = in_flight.pop(future)
+                spool, prints = future.result()
+                try:
+                    _write_source(conn, source, digest, _spooled_records(spool), counts, batch_size,
+                                  progress, prints)
+                finally:
+                    Path(spool).unlink(missing_ok=True)
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        _remove_spools(in_flight)
+        conn.close()
+
+    stats = _import_stats(counts, start, files=len(sources))
+    profiler.record("import.sources", stats["seconds"], files=len(sources), rows=counts["parsed"],
+                    inserted=counts["inserted"], skipped_files=counts["skipped_files"], workers=workers,
+                    engine=engine)
+    return stats
+
+
+def import_path(path, progress=None, workers=None, engine=DEFAULT_ENGINE):
+    path = Path(path)
+    if path.is_dir() or (path.suffix.lower() == ".zip" and zipfile.is_zipfile(path)):
+        return import_sources(collect_sources(path), progress=progress, workers=workers, engine=engine)
+    return save_csv_to_db(path, progress=progress, engine=engine)
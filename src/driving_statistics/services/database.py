@@ -1,9 +1,32 @@
+import re
 import sqlite3
+import threading
+import time
 from pathlib import Path
+from driving_statistics.services import profiler
 
 BASE_DIR = Path(__file__).parents[1]
 DATA_DIR = BASE_DIR / "data"
 DB_PATH = DATA_DIR / "driving_exams.db"
+FETCH_BATCH_SIZE = 1000
+CACHE_SIZE_KIB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+STATEMENT_CACHE_SIZE = 256
+TEXT_COLUMNS = ("province", "exam_center", "exam_type", "driving_school")
+# The trigram index can only narrow patterns with at least three characters.
+SEARCH_MIN_CHARS = 3
+# Sealed years live in their own files; a query attaches the ones it names.
+# SQLite's default build allows this many attached databases per connection.
+MAX_PARTITIONS = 10
+_PARTITION_REF = re.compile(r"\bpart_(\d{4})\.")
+
+# Pre-aggregated month x dimension totals, smallest first. Every rollup keeps
+# province so a province filter can still be answered from it.
+ROLLUPS = {
+    "rollup_province": ("province",),
+    "rollup_center": ("province", "exam_center"),
+    "rollup_school": ("province", "driving_school"),
+}
 
 COLUMNS = [
     ("province", "Provincia"),
@@ -17,48 +40,462 @@ COLUMNS = [
 ]
 
 
+_local = threading.local()
+
+
+def _configure(conn):
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
 def get_connection():
-    DATA_DIR.mkdir(exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    # Writer connection; the caller owns it and closes it when done.
+    return _configure(sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE))
 
 
-def init_database():
-    with get_connection() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS exams (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                province TEXT,
-                exam_center TEXT,
-                exam_type TEXT,
-                driving_school TEXT,
-                exam_month TEXT,
-                presented INTEGER,
-                passed INTEGER,
-                failed INTEGER
-            )
-        """)
-        # Keep only one row per logical record before enforcing uniqueness.
-        conn.execute("""
-            DELETE FROM exams
-            WHERE id NOT IN (
-                SELECT MIN(id)
-                FROM exams
-                GROUP BY
-                    province, exam_center, exam_type, driving_school,
-                    exam_month, presented, passed, failed
+def get_read_connection():
+    """Return this thread's long-lived read-only connection.
+
+    Each thread gets its own, so background queries can run while an import
+    writes through `get_connection()`; WAL keeps readers and the writer apart.
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = str(DB_PATH)
+    conn = conns.get(key)
+    if conn is None:
+        conn = conns[key] = open_read_connection()
+    return conn
+
+
+def open_read_connection():
+    # A private read-only connection; the caller closes it.
+    conn = sqlite3.connect(
+        f"{Path(DB_PATH).resolve().as_uri()}?mode=ro",
+        uri=True,
+        isolation_level=None,
+        check_same_thread=True,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    return _configure(conn)
+
+
+def partition_path(year):
+    return DATA_DIR / f"exams_{year}.db"
+
+
+def partition_schema(year):
+    return f"part_{year}"
+
+
+def sealed_partitions():
+    # (year, first_month, last_month) of every archived year, oldest first.
+    return fetch("SELECT year, first_month, last_month FROM partitions ORDER BY year")
+
+
+def _attach_partitions(conn, sql):
+    # Year files are opened read-only, and only once a query refers to them.
+    years = set(_PARTITION_REF.findall(sql))
+    if not years:
+        return
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    for year in sorted(years):
+        if partition_schema(year) not in attached:
+            conn.execute(
+                f"ATTACH DATABASE ? AS {partition_schema(year)}",
+                (f"{partition_path(year).resolve().as_uri()}?mode=ro",),
             )
-        """)
-        conn.execute("""
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_exams_unique_row
-            ON exams (
+
+
+def close_read_connections():
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+
+def init_database():
+    DATA_DIR.mkdir(exist_ok=True)
+    conn = get_connection()
+    try:
+        # WAL lets open streaming cursors coexist with a background import.
+        conn.execute("PRAGMA journal_mode = WAL")
+        version = schema_version(conn)
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute("BEGIN")
+            try:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _create_base_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS exams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            province TEXT,
+            exam_center TEXT,
+            exam_type TEXT,
+            driving_school TEXT,
+            exam_month TEXT,
+            presented INTEGER,
+            passed INTEGER,
+            failed INTEGER
+        )
+    """)
+    # Keep only one row per logical record before enforcing uniqueness.
+    conn.execute("""
+        DELETE FROM exams
+        WHERE id NOT IN (
+            SELECT MIN(id)
+            FROM exams
+            GROUP BY
                 province, exam_center, exam_type, driving_school,
                 exam_month, presented, passed, failed
+        )
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_exams_unique_row
+        ON exams (
+            province, exam_center, exam_type, driving_school,
+            exam_month, presented, passed, failed
+        )
+    """)
+
+
+def _create_month_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_exams_month ON exams (exam_month)")
+
+
+def _create_search_index(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'exams_search'"
+    ).fetchone()
+    if exists:
+        return
+
+    cols = ", ".join(TEXT_COLUMNS)
+    new_cols = ", ".join(f"new.{c}" for c in TEXT_COLUMNS)
+    old_cols = ", ".join(f"old.{c}" for c in TEXT_COLUMNS)
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE exams_search USING fts5(
+                {cols}, content='exams', content_rowid='id', tokenize='trigram'
             )
         """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5 trigram support: filters fall back to LIKE.
+        return
+
+    conn.execute(f"""
+        CREATE TRIGGER exams_search_ai AFTER INSERT ON exams BEGIN
+            INSERT INTO exams_search (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER exams_search_ad AFTER DELETE ON exams BEGIN
+            INSERT INTO exams_search (exams_search, rowid, {cols})
+            VALUES ('delete', old.id, {old_cols});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER exams_search_au AFTER UPDATE ON exams BEGIN
+            INSERT INTO exams_search (exams_search, rowid, {cols})
+            VALUES ('delete', old.id, {old_cols});
+            INSERT INTO exams_search (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    conn.execute("INSERT INTO exams_search (exams_search) VALUES ('rebuild')")
+
+
+def _create_rollups(conn):
+    for table, dims in ROLLUPS.items():
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (table,)
+        ).fetchone()
+        if exists:
+            continue
+        dim_defs = ", ".join(f"{d} TEXT NOT NULL" for d in dims)
+        conn.execute(f"""
+            CREATE TABLE {table} (
+                exam_month TEXT NOT NULL,
+                {dim_defs},
+                presented INTEGER NOT NULL,
+                passed INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                PRIMARY KEY (exam_month, {", ".join(dims)})
+            )
+        """)
+        _add_to_rollup(conn, table, dims, 0)
+
+
+def _add_to_rollup(conn, table, dims, after_id):
+    keys = ["exam_month", *dims]
+    key_exprs = ", ".join(f"COALESCE({k}, '')" for k in keys)
+    conn.execute(f"""
+        INSERT INTO {table} ({", ".join(keys)}, presented, passed, failed)
+        SELECT {key_exprs},
+               SUM(COALESCE(presented, 0)),
+               SUM(COALESCE(passed, 0)),
+               SUM(COALESCE(failed, 0))
+        FROM exams
+        WHERE id > ?
+        GROUP BY {key_exprs}
+        ON CONFLICT ({", ".join(keys)}) DO UPDATE SET
+            presented = presented + excluded.presented,
+            passed = passed + excluded.passed,
+            failed = failed + excluded.failed
+    """, (after_id,))
+
+
+def _create_filter_values(conn):
+    # Distinct text values per province, feeding the filter autocompletion.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS filter_values (
+            column_name TEXT NOT NULL,
+            province TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (column_name, province, value)
+        ) WITHOUT ROWID
+    """)
+    _add_filter_values(conn, 0)
+
+
+def _add_filter_values(conn, after_id):
+    for column in TEXT_COLUMNS:
+        conn.execute(f"""
+            INSERT OR IGNORE INTO filter_values (column_name, province, value)
+            SELECT DISTINCT ?, COALESCE(province, ''), {column}
+            FROM exams
+            WHERE id > ? AND {column} IS NOT NULL AND {column} != ''
+        """, (column, after_id))
+
+
+def _create_meta(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_generation', 0)")
+
+
+def _create_row_count(conn):
+    # Counted once here, then kept up to date by imports.
+    conn.execute("""
+        INSERT OR REPLACE INTO meta (key, value)
+        VALUES ('row_count', (SELECT COUNT(*) FROM exams))
+    """)
+
+
+def _create_import_ledger(conn):
+    # One row per imported file content; rows_done is the record offset of
+    # the last committed checkpoint, so an interrupted import can resume.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_files (
+            digest TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            complete INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_partitions (
+            exam_month TEXT NOT NULL,
+            province TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            PRIMARY KEY (exam_month, province)
+        ) WITHOUT ROWID
+    """)
+
+
+def _create_partitions(conn):
+    # Years moved out of `exams` into partition_path(year); see services.partitions.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS partitions (
+            year TEXT PRIMARY KEY,
+            rows INTEGER NOT NULL,
+            first_month TEXT NOT NULL,
+            last_month TEXT NOT NULL,
+            archived_at TEXT NOT NULL
+        )
+    """)
+
+
+def _fingerprint_import_partitions(conn):
+    # Partitions are now skipped only when their content matches, so the old
+    # one-file-per-partition rows are dropped; complete files stay skipped.
+    conn.execute("DROP TABLE IF EXISTS import_partitions")
+    conn.execute("""
+        CREATE TABLE import_partitions (
+            exam_month TEXT NOT NULL,
+            province TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            PRIMARY KEY (exam_month, province, digest)
+        ) WITHOUT ROWID
+    """)
+
+
+def _drop_search_insert_trigger(conn):
+    # A per-row trigger made imports ~5x slower; update_derived_tables now
+    # adds new rows to exams_search in bulk, in the same transaction.
+    conn.execute("DROP TRIGGER IF EXISTS exams_search_ai")
+
+
+# Schema steps applied once each, tracked in PRAGMA user_version. Append new
+# steps at the end; never change or reorder one that has already shipped.
+MIGRATIONS = [
+    _create_base_schema,
+    _create_month_index,
+    _create_search_index,
+    _create_rollups,
+    _create_filter_values,
+    _create_meta,
+    _create_row_count,
+    _create_import_ledger,
+    _create_partitions,
+    _fingerprint_import_partitions,
+    _drop_search_insert_trigger,
+]
+
+
+def max_exam_id(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM exams").fetchone()[0]
+
+
+def _add_to_search_index(conn, after_id):
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'exams_search'").fetchone():
+        return
+    cols = ", ".join(TEXT_COLUMNS)
+    conn.execute(f"""
+        INSERT INTO exams_search (rowid, {cols})
+        SELECT id, {cols} FROM exams WHERE id > ?
+    """, (after_id,))
+
+
+def update_derived_tables(conn, after_id):
+    # ids are AUTOINCREMENT, so everything above `after_id` is newly inserted.
+    for table, dims in ROLLUPS.items():
+        _add_to_rollup(conn, table, dims, after_id)
+    _add_filter_values(conn, after_id)
+    _add_to_search_index(conn, after_id)
+
+
+def record_inserted_rows(conn, inserted):
+    # Called inside an import transaction whenever new rows land in exams.
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_generation'")
+    conn.execute("UPDATE meta SET value = value + ? WHERE key = 'row_count'", (inserted,))
+
+
+def meta_value(key, default=0):
+    rows = fetch("SELECT value FROM meta WHERE key = ?", (key,))
+    return rows[0][0] if rows else default
+
+
+def data_generation():
+    return meta_value("data_generation")
+
+
+_search_index_cache = {}
+
+
+def has_search_index():
+    key = str(DB_PATH)
+    if key not in _search_index_cache:
+        _search_index_cache[key] = bool(
+            fetch("SELECT 1 FROM sqlite_master WHERE name = 'exams_search'")
+        )
+    return _search_index_cache[key]
+
+
+def _compact_sql(sql):
+    return " ".join(sql.split())
+
+
+def profiled_query(name, sql, params):
+    return profiler.profiled(name, sql=_compact_sql(sql), params=list(params))
+
+
+def _query_plan(conn, sql, params):
+    if not profiler.capture_plans() or sql.lstrip().upper().startswith("EXPLAIN"):
+        return None
+    try:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    except sqlite3.Error:
+        return None
 
 
 def fetch(sql, params=()):
-    with get_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(sql, params)
-        return cur.fetchall()
\ No newline at end of file
+    with profiled_query("database.fetch", sql, params) as info:
+        conn = get_read_connection()
+        _attach_partitions(conn, sql)
+        rows = conn.execute(sql, params).fetchall()
+        info["rows"] = len(rows)
+        info["plan"] = _query_plan(conn, sql, params)
+        return rows
+
+
+def iter_fetch(sql, params=(), size=FETCH_BATCH_SIZE, conn=None):
+    """Yield lists of at most `size` rows while the cursor stays open.
+
+    The open cursor holds a WAL snapshot on its connection until the
+    generator ends, so a cursor kept open between pages needs its own `conn`.
+    """
+    conn = conn or get_read_connection()
+    _attach_partitions(conn, sql)
+    info = {"sql": _compact_sql(sql), "params": list(params), "rows": 0}
+    # Only the time spent in SQLite counts; the caller may hold the
+    # generator open between batches for as long as it likes.
+    start = time.perf_counter()
+    cur = conn.execute(sql, params)
+    busy = 0.0
+    try:
+        while True:
+            batch = cur.fetchmany(size)
+            busy += time.perf_counter() - start
+            if not batch:
+                break
+            if not info["rows"]:
+                info["first_batch_ms"] = round(busy * 1000, 3)
+            info["rows"] += len(batch)
+            yield batch
+            start = time.perf_counter()
+    finally:
+        cur.close()
+        info["plan"] = _query_plan(conn, sql, params)
+        profiler.record("database.iter_fetch", busy, **info)
+
+
+def iter_rows(sql, params=(), size=FETCH_BATCH_SIZE):
+    for batch in iter_fetch(sql, params, size):
+        yield from batch
+
+
+def explain_query_plan(sql, params=()):
+    return [row[3] for row in fetch(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def full_table_scans(sql, params=()):
+    # Plan steps that read a whole table; FTS lookups and subquery scans are fine.
+    return [
+        step for step in explain_query_plan(sql, params)
+        if step.startswith("SCAN ")
+        and not step.startswith("SCAN (")
+        and "CONSTANT ROW" not in step
+        and "VIRTUAL TABLE INDEX" not in step
+    ]
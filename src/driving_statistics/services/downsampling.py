@@ -0,0 +1,51 @@
+MAX_SERIES_POINTS = 400
+MAX_BARS = 15
+OTHERS_LABEL = "Otros"
+
+
+def lttb_indices(xs, ys, threshold=MAX_SERIES_POINTS):
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; in between, each bucket keeps
+    the point that forms the largest triangle with the previous pick and the
+    average of the next bucket, which preserves peaks and dips.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, min(end, n - 1)):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def top_n_with_others(rows, n=MAX_BARS, value_index=1, label=OTHERS_LABEL):
+    # rows are (label, metric, metric, ...); the tail is folded into one row.
+    ranked = sorted(rows, key=lambda r: r[value_index] or 0, reverse=True)
+    if len(ranked) <= n:
+        return ranked
+    head, tail = ranked[:n - 1], ranked[n - 1:]
+    width = len(rows[0])
+    others = [label] + [sum(r[i] or 0 for r in tail) for i in range(1, width)]
+    return head + [tuple(others)]
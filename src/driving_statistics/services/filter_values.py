@@ -0,0 +1,31 @@
+from driving_statistics.services.database import fetch
+
+SUGGESTION_LIMIT = 200
+
+
+def suggest(column, text="", province="", limit=SUGGESTION_LIMIT):
+    """Return values of `column` containing `text`, prefix matches first.
+
+    With `province`, only values seen inside matching provinces are returned,
+    so the center and school lists follow the province already chosen.
+    """
+    where = ["column_name = ?"]
+    params = [column]
+    if province and column != "province":
+        where.append("province LIKE ?")
+        params.append(f"%{province}%")
+    if text:
+        where.append("value LIKE ?")
+        params.append(f"%{text}%")
+    params += [f"{text}%", limit]
+    rows = fetch(
+        f"""
+        SELECT value FROM filter_values
+        WHERE {" AND ".join(where)}
+        GROUP BY value
+        ORDER BY value LIKE ? DESC, value
+        LIMIT ?
+        """,
+        params,
+    )
+    return [r[0] for r in rows]
@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+HASH_CHUNK = 1 << 20
+FINGERPRINT_MASK = (1 << 64) - 1
+
+
+def digest_hasher():
+    return hashlib.sha256()
+
+
+def file_digest(f, tick=None):
+    # `tick` is called after every chunk, e.g. to let a cancel stop a long hash.
+    h = digest_hasher()
+    while chunk := f.read(HASH_CHUNK):
+        h.update(chunk)
+        if tick:
+            tick()
+    return h.hexdigest()
+
+
+def source_name(source):
+    if isinstance(source, tuple):
+        return "::".join(str(part) for part in source)
+    return str(source)
+
+
+def lookup(conn, digest):
+    # (rows_done, complete) for a known file content, else None.
+    return conn.execute(
+        "SELECT rows_done, complete FROM import_files WHERE digest = ?", (digest,)
+    ).fetchone()
+
+
+def partition_key(record):
+    return record[4], record[0]
+
+
+def _record_hash(record):
+    return int.from_bytes(hashlib.blake2b(repr(record).encode(), digest_size=8).digest(), "little")
+
+
+def fingerprinted(records, prints):
+    """Pass `records` through, adding each one to its partition in `prints`.
+
+    A partition's print is its row count plus the sum of its row hashes, so
+    it does not depend on row order: it matches exactly when the sorted
+    records match, without keeping them.
+    """
+    for r in records:
+        key = partition_key(r)
+        rows, total = prints.get(key, (0, 0))
+        prints[key] = (rows + 1, (total + _record_hash(r)) & FINGERPRINT_MASK)
+        yield r
+
+
+def has_partitions(conn):
+    # Whether any complete file has partition prints to compare against.
+    return conn.execute("""
+        SELECT 1 FROM import_partitions p
+        JOIN import_files f ON f.digest = p.digest
+        WHERE f.complete = 1
+        LIMIT 1
+    """).fetchone() is not None
+
+
+def unchanged_partitions(conn, digest, prints):
+    # Partitions another complete file brought in with exactly the same rows.
+    rows = conn.execute("""
+        SELECT p.exam_month, p.province, p.rows, p.fingerprint
+        FROM import_partitions p
+        JOIN import_files f ON f.digest = p.digest
+        WHERE f.complete = 1 AND p.digest <> ?
+    """, (digest,))
+    return {
+        (month, province) for month, province, count, fingerprint in rows
+        if prints.get((month, province)) == (count, int(fingerprint, 16))
+    }
+
+
+def checkpoint(conn, digest, source, rows_done, prints=None, complete=False):
+    conn.execute("""
+        INSERT INTO import_files (digest, source, rows_done, complete, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(digest) DO UPDATE SET
+            source = excluded.source,
+            rows_done = excluded.rows_done,
+            complete = excluded.complete,
+            updated_at = excluded.updated_at
+    """, (digest, source_name(source), rows_done, int(complete), time.strftime("%Y-%m-%d %H:%M:%S")))
+    if prints:
+        conn.executemany("""
+            INSERT OR REPLACE INTO import_partitions (exam_month, province, digest, rows, fingerprint)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+            (month, province, digest, count, f"{total:016x}")
+            for (month, province), (count, total) in prints.items()
+        ])
@@ -0,0 +1,143 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from driving_statistics.services.database import (
+    COLUMNS, MAX_PARTITIONS, TEXT_COLUMNS, get_connection, has_search_index, partition_path)
+
+EXAM_COLUMNS = ("id", *(k for k, _ in COLUMNS))
+
+
+def _year(year):
+    text = str(year).strip()
+    if len(text) != 4 or not text.isdigit():
+        raise ValueError(f"Año no valido: {year}")
+    return text
+
+
+def _month_bounds(year):
+    # Half-open range on exam_month so the month index can be used.
+    return f"{year}-", f"{int(year) + 1:04d}-"
+
+
+def sealed_years(conn):
+    return {row[0] for row in conn.execute("SELECT year FROM partitions")}
+
+
+def _build_partition(path, source_uri, year, search):
+    """Copy the exam rows of `year` into a fresh file at `path`.
+
+    Rows keep their ids, which AUTOINCREMENT never hands out again, so ids
+    stay unique across the main database and every partition.
+    """
+    cols = ", ".join(EXAM_COLUMNS)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS source", (source_uri,))
+        conn.execute("""
+            CREATE TABLE exams (
+                id INTEGER PRIMARY KEY,
+                province TEXT,
+                exam_center TEXT,
+                exam_type TEXT,
+                driving_school TEXT,
+                exam_month TEXT,
+                presented INTEGER,
+                passed INTEGER,
+                failed INTEGER
+            )
+        """)
+        conn.execute(
+            f"INSERT INTO exams ({cols}) SELECT {cols} FROM source.exams"
+            " WHERE exam_month >= ? AND exam_month < ? ORDER BY id",
+            _month_bounds(year),
+        )
+        conn.execute("CREATE INDEX idx_exams_month ON exams (exam_month)")
+        if search:
+            # Same trigram index as the main table, built once: the file never changes.
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE exams_search USING fts5(
+                    {", ".join(TEXT_COLUMNS)}, content='exams', content_rowid='id', tokenize='trigram'
+                )
+            """)
+            conn.execute("INSERT INTO exams_search (exams_search) VALUES ('rebuild')")
+        summary = conn.execute(
+            "SELECT COUNT(*), MIN(exam_month), MAX(exam_month) FROM exams"
+        ).fetchone()
+        conn.commit()
+        conn.execute("DETACH DATABASE source")
+    finally:
+        conn.close()
+    return summary
+
+
+def archive_year(year):
+    """Move every exam row of `year` into its own read-only partition file.
+
+    Rollups, filter values and the import ledger stay in the main database,
+    so totals do not change. Imports skip rows for archived years.
+    """
+    year = _year(year)
+    path = partition_path(year)
+    conn = get_connection()
+    try:
+        # Holding the write lock keeps imports out until the rows have moved.
+        conn.execute("BEGIN IMMEDIATE")
+        sealed = sealed_years(conn)
+        if year in sealed:
+            raise ValueError(f"El año {year} ya esta archivado")
+        if len(sealed) >= MAX_PARTITIONS:
+            raise ValueError(f"No se pueden archivar mas de {MAX_PARTITIONS} años")
+
+        # A file left by an interrupted archive was never registered.
+        for leftover in (path, Path(f"{path}-journal")):
+            leftover.unlink(missing_ok=True)
+        source_uri = f"{Path(conn.execute('PRAGMA database_list').fetchone()[2]).as_uri()}?mode=ro"
+        rows, first_month, last_month = _build_partition(path, source_uri, year, has_search_index())
+        if not rows:
+            path.unlink(missing_ok=True)
+            raise ValueError(f"No hay examenes de {year}")
+
+        # The partition is committed before the rows leave `exams`: a crash in
+        # between only leaves an unregistered file, never lost rows.
+        deleted = conn.execute(
+            "DELETE FROM exams WHERE exam_month >= ? AND exam_month < ?", _month_bounds(year)
+        ).rowcount
+        if deleted != rows:
+            raise RuntimeError(f"Se copiaron {rows} filas de {year} pero se borraban {deleted}")
+        conn.execute("""
+            INSERT INTO partitions (year, rows, first_month, last_month, archived_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (year, rows, first_month, last_month, time.strftime("%Y-%m-%d %H:%M:%S")))
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_generation'")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return {"year": year, "rows": rows, "first_month": first_month, "last_month": last_month,
+            "path": str(path), "bytes": path.stat().st_size}
+
+
+def _has_search(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'exams_search'").fetchone() is not None
+
+
+def compact_partition(year):
+    """VACUUM one partition file; other years and the main database are not touched."""
+    year = _year(year)
+    path = partition_path(year)
+    if not path.exists():
+        raise ValueError(f"El año {year} no esta archivado")
+    before = path.stat().st_size
+    conn = sqlite3.connect(path)
+    try:
+        if _has_search(conn):
+            conn.execute("INSERT INTO exams_search (exams_search) VALUES ('optimize')")
+            conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return {"year": year, "bytes_before": before, "bytes": path.stat().st_size}
+
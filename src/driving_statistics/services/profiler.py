@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+MAX_ENTRIES = 500
+# Set this variable to a file path to get every timing as a JSON line.
+LOG_ENV_VAR = "DRIVING_STATS_PROFILE_LOG"
+
+_entries = deque(maxlen=MAX_ENTRIES)
+_lock = threading.Lock()
+_sequence = 0
+_log_path = os.environ.get(LOG_ENV_VAR) or None
+_capture_plans = False
+
+
+def set_log_path(path):
+    global _log_path
+    _log_path = path or None
+
+
+def log_path():
+    return _log_path
+
+
+def set_capture_plans(enabled):
+    # EXPLAIN QUERY PLAN costs a second statement per query, so it is opt-in.
+    global _capture_plans
+    _capture_plans = bool(enabled)
+
+
+def capture_plans():
+    return _capture_plans
+
+
+def record(name, seconds, **details):
+    global _sequence
+    entry = {
+        "ts": time.time(),
+        "name": name,
+        "ms": round(seconds * 1000, 3),
+        "thread": threading.current_thread().name,
+        **details,
+    }
+    with _lock:
+        _sequence += 1
+        _entries.append(entry)
+        if _log_path:
+            with open(_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+    return entry
+
+
+@contextmanager
+def profiled(name, **details):
+    # Callers can add row counts or plans to the yielded dict before it closes.
+    info = dict(details)
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        record(name, time.perf_counter() - start, **info)
+
+
+def profile(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiled(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def entries():
+    with _lock:
+        return list(_entries)
+
+
+def sequence():
+    return _sequence
+
+
+def clear():
+    global _sequence
+    with _lock:
+        _sequence += 1
+        _entries.clear()
@@ -0,0 +1,358 @@
+from driving_statistics.services.database import (
+    COLUMNS, ROLLUPS, SEARCH_MIN_CHARS, fetch, has_search_index, meta_value, partition_schema,
+    sealed_partitions)
+
+METRIC_COLUMNS = ("presented", "passed", "failed")
+FILTER_COLUMNS = ("province", "exam_center", "driving_school", "exam_type")
+GROUP_COLUMNS = ("exam_month", "province", "exam_center", "driving_school", "exam_type")
+DERIVED_METRICS = {
+    "pass_rate": "% aptos",
+    "presented_delta": "Dif. presentados mes anterior",
+    "pass_rate_delta": "Dif. % aptos mes anterior",
+    "rank_in_province": "Puesto en la provincia",
+}
+RATE_METRICS = ("pass_rate", "pass_rate_delta")
+PIVOT_METRICS = (*METRIC_COLUMNS, "pass_rate")
+PASS_RATE_SQL = "1.0 * SUM(COALESCE(passed, 0)) / NULLIF(SUM(COALESCE(presented, 0)), 0)"
+MAX_PIVOT_COLUMNS = 24
+ALL_MONTHS = ("0000-00", "9999-99")
+# Results up to this size are kept whole; larger ones are streamed by the view.
+CACHED_ROWS_LIMIT = 5000
+
+
+def text_filter(column, text, schema="main"):
+    # Substring filters go through the trigram index when it can narrow them.
+    pattern = f"%{text}%"
+    if len(text) >= SEARCH_MIN_CHARS and has_search_index():
+        return f"id IN (SELECT rowid FROM {schema}.exams_search WHERE {column} LIKE ?)", pattern
+    return f"{column} LIKE ?", pattern
+
+
+def rollup_for(group_cols, filtered_cols):
+    # Smallest rollup holding every grouping column and every filtered column.
+    needed = {c for c in (*group_cols, *filtered_cols) if c != "exam_month"}
+    for table, dims in ROLLUPS.items():
+        if needed <= set(dims):
+            return table
+    return None
+
+
+def group_columns(filters):
+    """Grouping levels in order; `group_by` may be one column, a list or "a,b"."""
+    group_by = filters.get("group_by") or ()
+    if isinstance(group_by, str):
+        group_by = group_by.split(",")
+    cols = []
+    for col in (c.strip() for c in group_by):
+        if not col or col in cols:
+            continue
+        if col not in GROUP_COLUMNS:
+            raise ValueError(f"No se puede agrupar por {col}")
+        cols.append(col)
+    return cols
+
+
+def normalize_filters(filters):
+    """Filters with text stripped and `group_by` as a list; use it for both key and query."""
+    normalized = {k: v.strip() if isinstance(v, str) else v for k, v in filters.items()}
+    normalized["group_by"] = group_columns(normalized)
+    return normalized
+
+
+def column_header(col):
+    if "@" in col:
+        return col.partition("@")[2] or "(vacio)"
+    return dict(COLUMNS).get(col) or DERIVED_METRICS.get(col, col)
+
+
+def _where(filters, source, schema="main"):
+    where = []
+    params = []
+    for k in FILTER_COLUMNS:
+        if not filters.get(k):
+            continue
+        if source:
+            clause, param = f"{k} LIKE ?", f"%{filters[k]}%"
+        else:
+            clause, param = text_filter(k, filters[k], schema)
+        where.append(clause)
+        params.append(param)
+
+    where.append("(exam_month BETWEEN ? AND ? OR exam_month IS NULL OR exam_month = '')")
+    params += [filters["from_ym"], filters["to_ym"]]
+    return " WHERE " + " AND ".join(where), params
+
+
+def partition_schemas(filters):
+    # Archived years outside the month range are never attached nor read.
+    low, high = filters["from_ym"], filters["to_ym"]
+    return [
+        partition_schema(year) for year, first_month, last_month in sealed_partitions()
+        if first_month <= high and last_month >= low
+    ]
+
+
+def exam_source(filters):
+    """FROM target, WHERE clause and params for the exam detail rows.
+
+    Plain `exams` unless archived years fall in the month range; then a
+    UNION ALL of `exams` and those partitions, each filtered on its own.
+    """
+    where, params = _where(filters, None)
+    schemas = partition_schemas(filters)
+    if not schemas:
+        return "exams", where, params
+    cols = ", ".join(("id", *(k for k, _ in COLUMNS)))
+    parts = [f"SELECT {cols} FROM main.exams{where}"]
+    for schema in schemas:
+        part_where, part_params = _where(filters, None, schema)
+        parts.append(f"SELECT {cols} FROM {schema}.exams{part_where}")
+        params += part_params
+    return f"({' UNION ALL '.join(parts)}) AS exams", "", params
+
+
+def derived_metric_sql(metric, group_cols):
+    """Window/ratio expression for `metric` over the grouped rows, or None if it does not apply."""
+    others = [c for c in group_cols if c != "exam_month"]
+    partition = f"PARTITION BY {', '.join(others)} " if others else ""
+    if metric == "pass_rate":
+        return PASS_RATE_SQL
+    if metric == "presented_delta" and "exam_month" in group_cols:
+        presented = "SUM(COALESCE(presented, 0))"
+        return f"{presented} - LAG({presented}) OVER ({partition}ORDER BY exam_month)"
+    if metric == "pass_rate_delta" and "exam_month" in group_cols:
+        return f"{PASS_RATE_SQL} - LAG({PASS_RATE_SQL}) OVER ({partition}ORDER BY exam_month)"
+    if metric == "rank_in_province" and "province" in group_cols and set(group_cols) - {"province", "exam_month"}:
+        within = "province, exam_month" if "exam_month" in group_cols else "province"
+        return f"RANK() OVER (PARTITION BY {within} ORDER BY {PASS_RATE_SQL} DESC)"
+    return None
+
+
+def _pivot_cell(pivot, metric):
+    if metric == "pass_rate":
+        return (
+            f"1.0 * SUM(CASE WHEN {pivot} = ? THEN COALESCE(passed, 0) END)"
+            f" / NULLIF(SUM(CASE WHEN {pivot} = ? THEN COALESCE(presented, 0) END), 0)"
+        ), 2
+    return f"SUM(CASE WHEN {pivot} = ? THEN COALESCE({metric}, 0) ELSE 0 END)", 1
+
+
+def build_pivot_query(filters):
+    """Cross-tab: one row per grouping level, one column per value of `pivot`.
+
+    Only the `MAX_PIVOT_COLUMNS` busiest values (latest months for a month
+    pivot) become columns; each cell is a conditional aggregate in SQLite.
+    """
+    pivot = filters["pivot"]
+    metric = filters.get("pivot_metric") or "presented"
+    if pivot not in GROUP_COLUMNS or metric not in PIVOT_METRICS:
+        raise ValueError(f"Tabla cruzada no valida: {pivot}/{metric}")
+    row_cols = [c for c in group_columns(filters) if c != pivot]
+    filtered_cols = [k for k in FILTER_COLUMNS if filters.get(k)]
+    source = rollup_for([*row_cols, pivot], filtered_cols)
+    if source:
+        table = source
+        where, where_params = _where(filters, source)
+    else:
+        table, where, where_params = exam_source(filters)
+
+    order = f"{pivot} DESC" if pivot == "exam_month" else "SUM(COALESCE(presented, 0)) DESC"
+    values = [r[0] for r in fetch(
+        f"SELECT {pivot} FROM {table}{where} GROUP BY {pivot} ORDER BY {order} LIMIT ?",
+        [*where_params, MAX_PIVOT_COLUMNS],
+    )]
+    values.sort(key=lambda v: "" if v is None else str(v))
+
+    select_parts = list(row_cols)
+    params = []
+    cell, uses = _pivot_cell(pivot, metric)
+    for value in values:
+        select_parts.append(cell)
+        params += [value] * uses
+    if not select_parts:
+        select_parts.append("0")
+    sql = f"SELECT {', '.join(select_parts)} FROM {table}{where}"
+    params += where_params
+    if row_cols:
+        sql += f" GROUP BY {', '.join(row_cols)} ORDER BY {', '.join(row_cols)}"
+    limit_value = int(filters.get("limit") or 0)
+    if limit_value > 0:
+        sql += " LIMIT ?"
+        params.append(limit_value)
+
+    render_cols = row_cols + [f"{metric}@{'' if v is None else v}" for v in values]
+    return sql, params, render_cols, [column_header(c) for c in render_cols]
+
+
+def build_filtered_query(cols, filters):
+    if filters.get("pivot"):
+        return build_pivot_query(filters)
+    if not cols:
+        cols = [k for k, _ in COLUMNS]
+
+    group_cols = group_columns(filters)
+    filtered_cols = [k for k in FILTER_COLUMNS if filters.get(k)]
+    source = rollup_for(group_cols, filtered_cols) if group_cols else None
+    if source:
+        table = source
+        where, params = _where(filters, source)
+    else:
+        table, where, params = exam_source(filters)
+
+    limit_value = int(filters.get("limit") or 0)
+    render_cols = cols[:]
+
+    if group_cols:
+        metric_cols = [k for k in METRIC_COLUMNS if k in cols]
+        if not metric_cols:
+            metric_cols = list(METRIC_COLUMNS)
+        select_parts = list(group_cols)
+        for metric in metric_cols:
+            select_parts.append(f"SUM(COALESCE({metric}, 0)) AS {metric}")
+        render_cols = group_cols + metric_cols
+        # Ratios, deltas and ranks are evaluated by SQLite over the grouped rows.
+        for metric in filters.get("metrics") or ():
+            expr = derived_metric_sql(metric, group_cols)
+            if expr:
+                select_parts.append(f"{expr} AS {metric}")
+                render_cols.append(metric)
+        sql = f"SELECT {', '.join(select_parts)} FROM {table}{where}"
+        sql += f" GROUP BY {', '.join(group_cols)} ORDER BY {', '.join(group_cols)}"
+    else:
+        sql = f"SELECT {', '.join(cols)} FROM {table}{where}"
+
+    if limit_value > 0:
+        sql += " LIMIT ?"
+        params.append(limit_value)
+
+    render_headers = [column_header(k) for k in render_cols]
+    return sql, params, render_cols, render_headers
+
+
+def metric_totals(sql, params, cols):
+    # Totals are summed by SQLite so callers never need the detail rows.
+    metric_cols = [k for k in METRIC_COLUMNS if k in cols]
+    if not metric_cols:
+        return [], []
+    sums = ", ".join(f"SUM(COALESCE({m}, 0)) AS {m}" for m in metric_cols)
+    return fetch(f"SELECT {sums} FROM ({sql})", params), metric_cols
+
+
+def rollup_totals(filters, metric_cols):
+    """metric_totals of every row `filters` match, summed from a rollup.
+
+    None when no rollup holds the filtered columns (exam_type), or when a
+    row limit makes the totals depend on which rows come first.
+    """
+    source = rollup_for((), [k for k in FILTER_COLUMNS if filters.get(k)])
+    if not source or not metric_cols or int(filters.get("limit") or 0) > 0:
+        return None
+    sums = ", ".join(f"SUM({m}) AS {m}" for m in metric_cols)
+    where, params = _where(filters, source)
+    return fetch(f"SELECT {sums} FROM {source}{where}", params)
+
+
+def summarize_totals(totals, metric_cols):
+    # The single metric_totals row as {metric: int}, plus the pass rate.
+    row = totals[0] if totals else ()
+    summary = {k: int(v or 0) for k, v in zip(metric_cols, row)}
+    if "passed" in summary and "presented" in summary:
+        summary["pass_rate"] = summary["passed"] / summary["presented"] if summary["presented"] else 0.0
+    return summary
+
+
+def run_filtered_query(cols, filters):
+    sql, params, render_cols, render_headers = build_filtered_query(cols, filters)
+    head = fetch(f"SELECT * FROM ({sql}) LIMIT ?", [*params, CACHED_ROWS_LIMIT + 1])
+    if filters.get("pivot"):
+        # Pivot cells are not summable columns; totals come from the plain grouping.
+        total_sql, total_params, total_cols, _headers = build_filtered_query(cols, dict(filters, pivot=""))
+    else:
+        total_sql, total_params, total_cols = sql, params, render_cols
+    # The summary line should not cost a SUM over every matching exam row.
+    metric_cols = [k for k in METRIC_COLUMNS if k in total_cols]
+    totals = rollup_totals(filters, metric_cols)
+    if totals is None:
+        totals, metric_cols = metric_totals(total_sql, total_params, total_cols)
+    complete = len(head) <= CACHED_ROWS_LIMIT
+    return {
+        "sql": sql,
+        "params": params,
+        "cols": render_cols,
+        "headers": render_headers,
+        "rows": head if complete else None,
+        # The first rows of a larger result, so the table never re-runs it just to start.
+        "head": head if complete else head[:CACHED_ROWS_LIMIT],
+        "totals": totals,
+        "metric_cols": metric_cols,
+    }
+
+
+def data_overview():
+    # Only metadata, index edges and the province rollup: cost does not grow
+    # with the number of exam rows. Archived years are known from the registry.
+    first_month, last_month = fetch("""
+        SELECT MIN(first_month), MAX(last_month) FROM (
+            SELECT
+                (SELECT MIN(exam_month) FROM exams WHERE exam_month > '') AS first_month,
+                (SELECT MAX(exam_month) FROM exams WHERE exam_month > '') AS last_month
+            UNION ALL
+            SELECT first_month, last_month FROM partitions
+        )
+    """)[0]
+    totals = fetch(
+        "SELECT COALESCE(SUM(presented), 0), COALESCE(SUM(passed), 0), "
+        "COALESCE(SUM(failed), 0) FROM rollup_province"
+    )[0]
+    return {
+        "rows": meta_value("row_count"),
+        "first_month": first_month,
+        "last_month": last_month,
+        **dict(zip(METRIC_COLUMNS, totals)),
+    }
+
+
+def all_rows_filters(filters=None):
+    return dict(
+        filters or {},
+        province="",
+        exam_center="",
+        driving_school="",
+        exam_type="",
+        from_ym=ALL_MONTHS[0],
+        to_ym=ALL_MONTHS[1],
+        limit=0,
+        group_by="",
+    )
+
+
+def chart_data(cols, filters):
+    from driving_statistics.services.downsampling import lttb_indices, top_n_with_others
+
+    # Bars use the first non-month level only, without pivots or derived metrics.
+    levels = group_columns(filters)
+    group_by = next((c for c in levels if c != "exam_month"), "")
+    plain = dict(filters, group_by=group_by or levels[:1], metrics=(), pivot="")
+    sql, params, render_cols, _headers = build_filtered_query(cols, plain)
+    totals, metric_cols = metric_totals(sql, params, render_cols)
+
+    # Month series for the same filters, answered from a rollup when possible.
+    month_sql, month_params, _cols, _headers = build_filtered_query(
+        ["exam_month", *METRIC_COLUMNS], dict(plain, group_by="exam_month", limit=0)
+    )
+    months = [r for r in fetch(month_sql, month_params) if r[0]]
+    keep = lttb_indices(list(range(len(months))), [r[1] or 0 for r in months])
+    months = [months[i] for i in keep]
+
+    groups = []
+    if group_by:
+        groups = top_n_with_others(fetch(sql, params))
+
+    return {
+        "totals": totals,
+        "metric_cols": metric_cols,
+        "months": months,
+        "group_by": group_by,
+        "group_cols": render_cols if groups else [],
+        "groups": groups,
+    }
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from driving_statistics.services.database import data_generation
+
+CACHE_SIZE = 32
+
+
+def filter_key(cols, filters):
+    # `filters` must come from normalize_filters(), the same dict the query runs
+    # with, so a key never stands for a different query. Dict order does not matter.
+    normalized = tuple(sorted(
+        (k, tuple(v) if isinstance(v, (list, tuple)) else v) for k, v in filters.items()
+    ))
+    return tuple(cols or ()), normalized
+
+
+class QueryCache:
+    """Bounded LRU of query results, emptied whenever an import bumps the data generation."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._generation = None
+        self._entries = OrderedDict()
+
+    def _check_generation(self):
+        generation = data_generation()
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key, compute):
+        value = self.peek(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def peek(self, key):
+        # Counts a hit or a miss like get(), but never computes.
+        self._check_generation()
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        # Results computed elsewhere (e.g. on a worker thread) are stored here.
+        self._check_generation()
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "generation": self._generation,
+        }
@@ -1,44 +1,111 @@
-from PyQt6.QtGui import QTextDocument
+import os
+import time
+from PyQt6.QtCore import QMarginsF, QRectF, Qt
+from PyQt6.QtGui import QColor, QFont, QFontMetricsF, QPageLayout, QPageSize, QPainter, QPdfWriter
 from PyQt6.QtPrintSupport import QPrinter
+from driving_statistics.services import profiler
+from driving_statistics.services.database import fetch, iter_rows
 
+REPORT_FONT = "Segoe UI"
+REPORT_FONT_SIZE = 9
+REPORT_DPI = 150
 
+
+class ReportCancelled(Exception):
+    pass
+
+
+@profiler.profile("report.table_pdf")
 def export_table_pdf(table_widget, path):
     printer = QPrinter(QPrinter.PrinterMode.HighResolution)
     printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
     printer.setOutputFileName(path)
 
     # Render only the visible area (like a screenshot).
-    from PyQt6.QtGui import QPainter
     painter = QPainter(printer)
     table_widget.render(painter)
     painter.end()
 
 
-def export_html_pdf(rows, cols, headers, path):
-    printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-    printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
-    printer.setOutputFileName(path)
+def _default_formatter(col_key, value):
+    return "" if value is None else str(value)
+
 
-    html = build_html_table(rows, cols, headers)
-    doc = QTextDocument()
-    doc.setHtml(html)
-    doc.print(printer)
-
-
-def build_html_table(rows, cols, headers):
-    css = """
-    <style>
-      body { font-family: "Segoe UI", Arial, sans-serif; font-size: 10pt; }
-      table { border-collapse: collapse; width: 100%; }
-      th, td { border: 1px solid #999; padding: 4px 6px; }
-      th { background: #efefef; text-align: left; }
-      tr:nth-child(even) td { background: #fafafa; }
-    </style>
+def export_rows_pdf(sql, params, cols, headers, path, formatter=None, progress=None):
+    """Paint the rows of `sql` into a PDF one page at a time.
+
+    Rows are streamed from SQLite, so memory holds a single page whatever
+    the result size. `progress(done, total)` is called after every page;
+    raising `ReportCancelled` from it stops the export and removes the file.
     """
-    thead = "".join(f"<th>{h}</th>" for h in headers)
-    body_rows = []
-    for row in rows:
-        tds = "".join(f"<td>{'' if v is None else v}</td>" for v in row)
-        body_rows.append(f"<tr>{tds}</tr>")
-    tbody = "".join(body_rows)
-    return f"<!doctype html><html><head>{css}</head><body><table><thead><tr>{thead}</tr></thead><tbody>{tbody}</tbody></table></body></html>"
+    formatter = formatter or _default_formatter
+    start = time.perf_counter()
+    total = fetch(f"SELECT COUNT(*) FROM ({sql})", params)[0][0]
+
+    writer = QPdfWriter(path)
+    writer.setResolution(REPORT_DPI)
+    orientation = QPageLayout.Orientation.Landscape if len(cols) > 5 else QPageLayout.Orientation.Portrait
+    writer.setPageLayout(QPageLayout(
+        QPageSize(QPageSize.PageSizeId.A4), orientation, QMarginsF(12, 12, 12, 12), QPageLayout.Unit.Millimeter
+    ))
+
+    painter = QPainter(writer)
+    cancelled = False
+    try:
+        font = QFont(REPORT_FONT, REPORT_FONT_SIZE)
+        painter.setFont(font)
+        metrics = QFontMetricsF(font, writer)
+        row_h = metrics.height() * 1.6
+        width = writer.width()
+        height = writer.height()
+        col_w = width / max(len(cols), 1)
+        per_page = max(int((height - 2 * row_h) // row_h) - 1, 1)
+        pages = max((total + per_page - 1) // per_page, 1)
+
+        grid = QColor("#999999")
+        ink = QColor("#000000")
+
+        def draw_row(y, values, header=False):
+            if header:
+                painter.fillRect(QRectF(0, y, width, row_h), QColor("#efefef"))
+            for c, text in enumerate(values):
+                cell = QRectF(c * col_w, y, col_w, row_h)
+                painter.setPen(grid)
+                painter.drawRect(cell)
+                painter.setPen(ink)
+                inner = cell.adjusted(4, 0, -4, 0)
+                shown = metrics.elidedText(text, Qt.TextElideMode.ElideRight, inner.width())
+                painter.drawText(inner, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, shown)
+
+        def start_page(number):
+            draw_row(0, headers, header=True)
+            footer = QRectF(0, height - row_h, width, row_h)
+            painter.drawText(footer, Qt.AlignmentFlag.AlignCenter, f"Pagina {number} de {pages}")
+
+        page = 1
+        done = 0
+        line = 0
+        start_page(page)
+        for row in iter_rows(sql, params):
+            if line == per_page:
+                if progress:
+                    progress(done, total)
+                writer.newPage()
+                page += 1
+                line = 0
+                start_page(page)
+            draw_row((line + 1) * row_h, [formatter(cols[i], v) for i, v in enumerate(row)])
+            line += 1
+            done += 1
+        if progress:
+            progress(done, total)
+    except ReportCancelled:
+        cancelled = True
+        raise
+    finally:
+        painter.end()
+        del writer
+        if cancelled and os.path.exists(path):
+            os.remove(path)
+    profiler.record("report.rows_pdf", time.perf_counter() - start, rows=done, pages=page)
+    return {"rows": done, "pages": page}
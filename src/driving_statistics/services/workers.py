@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from driving_statistics.services.csv_importer import ImportCancelled, import_path
+
+
+class ImportWorker(QThread):
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def _on_progress(self, parsed, inserted):
+        if self._cancel_requested:
+            raise ImportCancelled()
+        self.progress.emit(parsed, inserted)
+
+    def run(self):
+        try:
+            stats = import_path(self.path, progress=self._on_progress)
+        except ImportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(stats)
+
+
+class ReportWorker(QThread):
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, sql, params, cols, headers, path, formatter=None, parent=None):
+        super().__init__(parent)
+        self.args = (sql, params, cols, headers, path)
+        self.formatter = formatter
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def _on_progress(self, done, total):
+        from driving_statistics.services.reports import ReportCancelled
+
+        if self._cancel_requested:
+            raise ReportCancelled()
+        self.progress.emit(done, total)
+
+    def run(self):
+        # QtPrintSupport is only loaded once a report is actually requested.
+        from driving_statistics.services.reports import ReportCancelled, export_rows_pdf
+
+        try:
+            stats = export_rows_pdf(*self.args, formatter=self.formatter, progress=self._on_progress)
+        except ReportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(stats)
+
+
+class QueryWorker(QThread):
+    """Long-lived thread that runs filter queries off the GUI thread.
+
+    Only the newest request is kept: submitting while a query runs calls
+    `interrupt()` on this thread's read connection, so a stale query stops
+    at its next SQLite step instead of running to completion.
+    """
+
+    result_ready = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._wake = threading.Condition()
+        self._pending = None
+        self._conn = None
+        self._busy = False
+        self._stopping = False
+
+    def submit(self, request_id, cols, filters):
+        with self._wake:
+            self._pending = (request_id, cols, filters)
+            if self._busy and self._conn is not None:
+                self._conn.interrupt()
+            self._wake.notify()
+
+    def stop(self):
+        with self._wake:
+            self._stopping = True
+            self._pending = None
+            if self._busy and self._conn is not None:
+                self._conn.interrupt()
+            self._wake.notify()
+        self.wait()
+
+    def run(self):
+        from driving_statistics.services.database import close_read_connections, get_read_connection
+        from driving_statistics.services.queries import run_filtered_query
+
+        try:
+            while True:
+                with self._wake:
+                    while self._pending is None and not self._stopping:
+                        self._wake.wait()
+                    if self._stopping:
+                        return
+                    request_id, cols, filters = self._pending
+                    self._pending = None
+                    self._conn = get_read_connection()
+                    self._busy = True
+                try:
+                    result = run_filtered_query(cols, filters)
+                except sqlite3.OperationalError as e:
+                    if "interrupted" not in str(e):
+                        self.failed.emit(request_id, str(e))
+                except Exception as e:
+                    self.failed.emit(request_id, str(e))
+                else:
+                    self.result_ready.emit(request_id, (cols, filters, result))
+                finally:
+                    with self._wake:
+                        self._busy = False
+        finally:
+            close_read_connections()
@@ -0,0 +1,73 @@
+"""Cold-start import budget check.
+
+Runs ``python -X importtime`` on the GUI controller module in a fresh
+interpreter and fails when its imports take longer than the budget or pull
+in one of the subsystems that must stay lazy. tests/test_startup_budget.py
+runs the same check under pytest. Usage::
+
+    python -m driving_statistics.startup_budget [--budget-ms 800]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+STARTUP_MODULE = "driving_statistics.mainc"
+BUDGET_MS = 800
+DEFERRED_MODULES = ("PyQt6.QtCharts", "PyQt6.QtPrintSupport", "pandas")
+
+
+def measure_imports(module=STARTUP_MODULE):
+    # The fresh interpreter finds this package where the current one did.
+    package_root = str(Path(__file__).resolve().parent.parent)
+    paths = (package_root, os.environ.get("PYTHONPATH"))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in paths if p))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    cumulative_us = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name_field = line.split("|")
+        name = name_field.strip()
+        cumulative_us[name] = int(cumulative)
+        # Top-level entries have no nesting indent; they add up to the total.
+        if name_field[1:2] != " " and name.split(".")[0] == module.split(".")[0]:
+            total_us += int(cumulative)
+    return total_us / 1000, cumulative_us
+
+
+def check(budget_ms=BUDGET_MS, module=STARTUP_MODULE):
+    total_ms, modules = measure_imports(module)
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"{module} tarda {total_ms:.0f} ms en importarse (limite {budget_ms} ms)")
+    for name in DEFERRED_MODULES:
+        if name in modules:
+            problems.append(f"{name} se importa al arrancar")
+    return total_ms, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="driving_statistics.startup_budget")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    total_ms, problems = check(args.budget_ms)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    print(f"{STARTUP_MODULE}: {total_ms:.0f} ms (limite {args.budget_ms:.0f} ms)")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Synthetic DGT exam files for benchmarks.
+
+Writes semicolon-separated files with the headers of the DGT "examenes por
+autoescuela" export, so they go through the same import path as the real
+downloads. The same seed always produces the same rows. Usage::
+
+    python -m driving_statistics.synthetic_data OUT --rows 1000000 [--files 12]
+"""
+import argparse
+import csv
+import random
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+SEED = 2024
+ENCODING = "cp1252"
+START_YEAR = 2000
+WRITE_BATCH = 10000
+
+HEADER = (
+    "DESC_PROVINCIA", "CENTRO_EXAMEN", "CODIGO_AUTOESCUELA", "CODIGO_SECCION", "NOMBRE_AUTOESCUELA",
+    "MES", "ANYO", "TIPO_EXAMEN", "NOMBRE_PERMISO", "NUM_APTOS", "NUM_APTOS_1conv", "NUM_APTOS_2conv",
+    "NUM_APTOS_3o4conv", "NUM_APTOS_5_o_mas_conv", "NUM_NO_APTOS",
+)
+PROVINCES = (
+    "Álava", "Albacete", "Alicante", "Almería", "Asturias", "Ávila", "Badajoz", "Baleares", "Barcelona",
+    "Burgos", "Cáceres", "Cádiz", "Cantabria", "Castellón", "Ceuta", "Ciudad Real", "Córdoba", "Coruña",
+    "Cuenca", "Girona", "Granada", "Guadalajara", "Guipúzcoa", "Huelva", "Huesca", "Jaén", "León",
+    "Lleida", "Lugo", "Madrid", "Málaga", "Melilla", "Murcia", "Navarra", "Ourense", "Palencia",
+    "Las Palmas", "Pontevedra", "La Rioja", "Salamanca", "Santa Cruz de Tenerife", "Segovia", "Sevilla",
+    "Soria", "Tarragona", "Teruel", "Toledo", "Valencia", "Valladolid", "Vizcaya", "Zamora", "Zaragoza",
+)
+# Rough share of schools; provinces not listed weigh 1.
+PROVINCE_WEIGHTS = {"Madrid": 14, "Barcelona": 12, "Valencia": 6, "Sevilla": 5, "Málaga": 4, "Alicante": 4}
+SCHOOL_WORDS = (
+    "Sol", "Norte", "Centro", "Avenida", "Plaza", "Victoria", "Europa", "Real", "Rápida", "Nueva",
+    "Castilla", "Mar", "Sierra", "Puerta", "Vía", "Ronda", "Luna", "Triunfo", "Progreso", "Pilar",
+)
+EXAM_TYPES = ("PRUEBA TEORICA", "PRUEBA DE CONTROL DE APTITUDES", "PRUEBA DE CIRCULACION")
+PERMITS = ("B", "A2", "A1", "AM", "C", "C1", "D", "CE", "BE")
+PERMIT_WEIGHTS = (40, 8, 3, 3, 3, 1, 1, 1, 1)
+
+
+def _school_count(rows):
+    # About a year of data for small sets; large sets also get more schools.
+    return min(max(rows // 60, 10), 30000)
+
+
+def _schools(rng, count):
+    weights = [PROVINCE_WEIGHTS.get(p, 1) for p in PROVINCES]
+    schools = []
+    for i in range(count):
+        province = rng.choices(PROVINCES, weights)[0]
+        center = f"{province.upper()} {rng.randint(1, 3 + PROVINCE_WEIGHTS.get(province, 1))}"
+        name = f"AUTOESCUELA {rng.choice(SCHOOL_WORDS).upper()} {i + 1}"
+        permits = set(rng.choices(PERMITS, PERMIT_WEIGHTS, k=rng.randint(1, 3))) | {"B"}
+        # The B licence has no separate manoeuvre test.
+        combos = [
+            (t, p) for p in sorted(permits) for t in EXAM_TYPES
+            if t != "PRUEBA DE CONTROL DE APTITUDES" or p != "B"
+        ]
+        schools.append((province, center, f"{i + 1:05d}", name, combos, rng.uniform(0.35, 0.85)))
+    return schools
+
+
+def iter_rows(rows, seed=SEED):
+    """Yield `rows` DGT rows, month after month, without repeating a record."""
+    rng = random.Random(seed)
+    schools = _schools(rng, _school_count(rows))
+    produced = 0
+    month_index = 0
+    while produced < rows:
+        year, month = divmod(month_index, 12)
+        month_index += 1
+        for province, center, code, name, combos, pass_rate in schools:
+            for exam_type, permit in combos:
+                presented = rng.randint(1, 25)
+                passed = min(presented, int(presented * pass_rate + rng.random() * 2))
+                first = passed * 6 // 10
+                second = passed * 2 // 10
+                third = passed // 10
+                yield (
+                    province, center, code, "1", name, month + 1, START_YEAR + year, exam_type, permit,
+                    passed, first, second, third, passed - first - second - third, presented - passed,
+                )
+                produced += 1
+                if produced == rows:
+                    return
+
+
+def write_dataset(path, rows, seed=SEED, files=1, encoding=ENCODING):
+    """Write `rows` rows to `path`, or split over `files` files inside it.
+
+    Returns the written file paths.
+    """
+    path = Path(path)
+    if files > 1:
+        path.mkdir(parents=True, exist_ok=True)
+        targets = [path / f"dgt_{i + 1:04d}.txt" for i in range(files)]
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        targets = [path]
+
+    source = iter_rows(rows, seed)
+    per_file, extra = divmod(rows, len(targets))
+    for i, target in enumerate(targets):
+        remaining = per_file + (1 if i < extra else 0)
+        with open(target, "w", encoding=encoding, newline="") as f:
+            writer = csv.writer(f, delimiter=";", lineterminator="\r\n")
+            writer.writerow(HEADER)
+            while remaining:
+                batch = list(islice(source, min(remaining, WRITE_BATCH)))
+                writer.writerows(batch)
+                remaining -= len(batch)
+    return targets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="driving_statistics.synthetic_data")
+    parser.add_argument("output", help="fichero de salida, o carpeta si --files > 1")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--encoding", default=ENCODING)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    targets = write_dataset(args.output, args.rows, args.seed, args.files, args.encoding)
+    seconds = time.perf_counter() - start
+    print(f"{args.rows} filas en {len(targets)} fichero(s), {seconds:.1f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
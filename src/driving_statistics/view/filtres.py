@@ -1,13 +1,42 @@
-from PyQt6.QtWidgets import *
-from PyQt6.QtCore import Qt, QDate, QEvent
-from driving_statistics.services.database import fetch, COLUMNS
+from PyQt6.QtWidgets import (
+    QCheckBox, QComboBox, QCompleter, QDateEdit, QDialog, QFormLayout, QGroupBox,
+    QHBoxLayout, QLineEdit, QPushButton, QSpinBox, QVBoxLayout)
+from PyQt6.QtCore import Qt, QDate, QEvent, QStringListModel
+from driving_statistics.services.database import COLUMNS
+from driving_statistics.services.filter_values import suggest
+from driving_statistics.services.queries import DERIVED_METRICS, group_columns
+
+GROUP_CHOICES = (
+    ("Ano o mes y ano", "exam_month"),
+    ("Provincia", "province"),
+    ("Centro de examen", "exam_center"),
+    ("Autoescuela", "driving_school"),
+    ("Tipo de examen", "exam_type"),
+)
+PIVOT_METRIC_CHOICES = (
+    ("Presentados", "presented"),
+    ("Aptos", "passed"),
+    ("No aptos", "failed"),
+    ("% aptos", "pass_rate"),
+)
+
+
+def choice_combo(empty_label, choices, current):
+    combo = QComboBox()
+    if empty_label:
+        combo.addItem(empty_label, "")
+    for label, key in choices:
+        combo.addItem(label, key)
+    idx = combo.findData(current)
+    combo.setCurrentIndex(idx if idx >= 0 else 0)
+    return combo
 
 
 class FilterDialog(QDialog):
     def __init__(self, parent=None, initial=None):
         super().__init__(parent)
         self.setWindowTitle("Filtros")
-        self.resize(500, 500)
+        self.resize(500, 700)
         initial = initial or {}
         initial_cols = initial.get("cols", [])
         initial_filters = initial.get("filters", {})
@@ -44,15 +73,24 @@ class FilterDialog(QDialog):
         self.limit.setSpecialValueText("Sin limite")
         self.limit.setValue(int(initial_filters.get("limit") or 0))
 
-        self.group_by = QComboBox()
-        self.group_by.addItem("Sin agrupar", "")
-        self.group_by.addItem("Ano o mes y ano", "exam_month")
-        self.group_by.addItem("Provincia", "province")
-        self.group_by.addItem("Centro de examen", "exam_center")
-        self.group_by.addItem("Autoescuela", "driving_school")
-        initial_group = initial_filters.get("group_by", "")
-        idx = self.group_by.findData(initial_group)
-        self.group_by.setCurrentIndex(idx if idx >= 0 else 0)
+        # Up to three nested levels, e.g. provincia -> centro -> mes.
+        initial_groups = group_columns(initial_filters) + ["", "", ""]
+        self.group_levels = [
+            choice_combo("Sin agrupar", GROUP_CHOICES, initial_groups[i]) for i in range(3)
+        ]
+        self.group_by = self.group_levels[0]
+
+        self.metric_checks = {}
+        metrics_box = QGroupBox("Metricas calculadas (con agrupacion)")
+        metrics_layout = QVBoxLayout(metrics_box)
+        for key, label in DERIVED_METRICS.items():
+            cb = QCheckBox(label)
+            cb.setChecked(key in (initial_filters.get("metrics") or ()))
+            self.metric_checks[key] = cb
+            metrics_layout.addWidget(cb)
+
+        self.pivot = choice_combo("Sin tabla cruzada", GROUP_CHOICES, initial_filters.get("pivot", ""))
+        self.pivot_metric = choice_combo("", PIVOT_METRIC_CHOICES, initial_filters.get("pivot_metric", ""))
 
         default_from = QDate.currentDate().addMonths(-6)
         default_to = QDate.currentDate()
@@ -71,7 +109,11 @@ class FilterDialog(QDialog):
         form.addRow("Autoescuela", self.school)
         form.addRow("Tipo", self.exam_type)
         form.addRow("Limite", self.limit)
-        form.addRow("Agrupar por", self.group_by)
+        form.addRow("Agrupar por", self.group_levels[0])
+        form.addRow("Despues por", self.group_levels[1])
+        form.addRow("Y por", self.group_levels[2])
+        form.addRow("Tabla cruzada por", self.pivot)
+        form.addRow("Valor de la tabla", self.pivot_metric)
 
         row = QHBoxLayout()
         row.addWidget(self.from_date)
@@ -79,6 +121,7 @@ class FilterDialog(QDialog):
         form.addRow("Mes", row)
 
         layout.addLayout(form)
+        layout.addWidget(metrics_box)
 
         btns = QHBoxLayout()
         ok = QPushButton("Aplicar")
@@ -95,25 +138,34 @@ class FilterDialog(QDialog):
             w.installEventFilter(self)
 
     def _setup_completers(self):
-        self._set_completer(self.province, self._distinct("province"))
-        self._set_completer(self.center, self._distinct("exam_center"))
-        self._set_completer(self.school, self._distinct("driving_school"))
-        self._set_completer(self.exam_type, self._distinct("exam_type"))
+        self._completer_columns = {
+            self.province: "province",
+            self.center: "exam_center",
+            self.school: "driving_school",
+            self.exam_type: "exam_type",
+        }
+        for widget in self._completer_columns:
+            self._set_completer(widget)
+            widget.textEdited.connect(lambda _text, w=widget: self._refresh_completer(w))
 
-    def _set_completer(self, widget, values):
-        comp = QCompleter(values)
+    def _set_completer(self, widget):
+        comp = QCompleter(QStringListModel(), widget)
         comp.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         comp.setFilterMode(Qt.MatchFlag.MatchContains)
         widget.setCompleter(comp)
 
-    def _distinct(self, column):
-        rows = fetch(f"SELECT DISTINCT {column} FROM exams WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}")
-        return [r[0] for r in rows]
+    def _refresh_completer(self, widget):
+        # Suggestions come pre-filtered from the filter_values table; the
+        # province typed so far narrows the other lists.
+        column = self._completer_columns[widget]
+        values = suggest(column, widget.text().strip(), self.province.text().strip())
+        widget.completer().model().setStringList(values)
 
     def eventFilter(self, obj, event):
         if event.type() == QEvent.Type.FocusIn:
             comp = obj.completer()
             if comp:
+                self._refresh_completer(obj)
                 comp.complete()
         return super().eventFilter(obj, event)
 
@@ -127,5 +179,8 @@ class FilterDialog(QDialog):
             "from_ym": self.from_date.date().toString("yyyy-MM"),
             "to_ym": self.to_date.date().toString("yyyy-MM"),
             "limit": self.limit.value(),
-            "group_by": self.group_by.currentData(),
+            "group_by": [c.currentData() for c in self.group_levels if c.currentData()],
+            "metrics": [k for k, cb in self.metric_checks.items() if cb.isChecked()],
+            "pivot": self.pivot.currentData(),
+            "pivot_metric": self.pivot_metric.currentData(),
         }
@@ -0,0 +1,86 @@
+from PyQt6.QtCore import QDate, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QDateEdit, QDockWidget, QFormLayout, QHBoxLayout, QLabel, QLineEdit, QWidget
+from driving_statistics.services.queries import ALL_MONTHS, group_columns
+from driving_statistics.view.filtres import GROUP_CHOICES, choice_combo
+
+DEBOUNCE_MS = 300
+TEXT_FILTERS = (
+    ("province", "Provincia"),
+    ("exam_center", "Centro"),
+    ("driving_school", "Autoescuela"),
+    ("exam_type", "Tipo"),
+)
+
+
+def _month_date(ym, fallback):
+    date = QDate.fromString(f"{ym}-01", "yyyy-MM-dd") if ym and ym not in ALL_MONTHS else QDate()
+    return date if date.isValid() else fallback
+
+
+class LiveFilterPanel(QDockWidget):
+    """Filters applied while typing; emits `filters_changed` once edits pause."""
+
+    filters_changed = pyqtSignal(dict)
+
+    def __init__(self, initial=None, first_month="", last_month="", parent=None):
+        super().__init__("Filtro rapido", parent)
+        self.setObjectName("live_filter_panel")
+        initial = initial or {}
+        self.base = dict(initial)
+        body = QWidget()
+        form = QFormLayout(body)
+
+        self.edits = {}
+        for key, label in TEXT_FILTERS:
+            edit = QLineEdit(initial.get(key, ""))
+            edit.setClearButtonEnabled(True)
+            edit.textEdited.connect(self._schedule)
+            self.edits[key] = edit
+            form.addRow(label, edit)
+
+        today = QDate.currentDate()
+        self.from_date = QDateEdit(_month_date(initial.get("from_ym") or first_month, today.addYears(-1)))
+        self.to_date = QDateEdit(_month_date(initial.get("to_ym") or last_month, today))
+        months = QHBoxLayout()
+        for d in (self.from_date, self.to_date):
+            d.setDisplayFormat("MM/yyyy")
+            d.setCalendarPopup(True)
+            d.dateChanged.connect(self._schedule)
+            months.addWidget(d)
+        form.addRow("Mes", months)
+
+        levels = group_columns(initial)
+        self.group_by = choice_combo("Sin agrupar", GROUP_CHOICES, levels[0] if levels else "")
+        self.group_by.currentIndexChanged.connect(self._schedule)
+        form.addRow("Agrupar por", self.group_by)
+
+        self.status = QLabel()
+        form.addRow(self.status)
+        self.setWidget(body)
+
+        # Every edit restarts the timer, so only the last state is queried.
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_MS)
+        self.timer.timeout.connect(self._emit)
+
+    def _schedule(self, *_args):
+        self.timer.start()
+
+    def filters(self):
+        filters = dict(
+            self.base,
+            from_ym=self.from_date.date().toString("yyyy-MM"),
+            to_ym=self.to_date.date().toString("yyyy-MM"),
+            group_by=[self.group_by.currentData()] if self.group_by.currentData() else [],
+            pivot="",
+        )
+        for key, edit in self.edits.items():
+            filters[key] = edit.text().strip()
+        return filters
+
+    def _emit(self):
+        self.filters_changed.emit(self.filters())
+
+    def set_status(self, text):
+        self.status.setText(text)
@@ -1,4 +1,4 @@
-from PyQt6.QtWidgets import QMainWindow, QTableWidget, QTabWidget, QWidget, QVBoxLayout, QLabel
+from PyQt6.QtWidgets import QMainWindow, QTableView, QTabWidget, QWidget, QVBoxLayout, QLabel
 from PyQt6.QtCore import Qt
 
 
@@ -8,12 +8,16 @@ class MainWindowUI(QMainWindow):
         self.setWindowTitle("Driving Exams")
         self.resize(900, 600)
 
-        self.table = QTableWidget()
+        self.table = QTableView()
         self.tabs = QTabWidget()
 
         table_page = QWidget()
         table_layout = QVBoxLayout(table_page)
+        self.overview_label = QLabel()
+        table_layout.addWidget(self.overview_label)
         table_layout.addWidget(self.table)
+        self.summary_label = QLabel()
+        table_layout.addWidget(self.summary_label)
         self.tabs.addTab(table_page, "Tabla")
 
         self.chart_page = QWidget()
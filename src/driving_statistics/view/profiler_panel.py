@@ -0,0 +1,103 @@
+import json
+import time
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (
+    QCheckBox, QDockWidget, QFileDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QVBoxLayout, QWidget)
+from driving_statistics.services import profiler
+
+HEADERS = ("Hora", "Operacion", "ms", "Filas", "Detalle")
+SHOWN_KEYS = ("ts", "name", "ms", "rows", "plan", "thread")
+REFRESH_MS = 1000
+
+
+def _detail(entry):
+    extra = {k: v for k, v in entry.items() if k not in SHOWN_KEYS}
+    return json.dumps(extra, ensure_ascii=False, default=str)
+
+
+def _tooltip(entry):
+    lines = [entry.get("sql") or entry["name"]]
+    if entry.get("plan"):
+        lines.append("")
+        lines.extend(entry["plan"])
+    return "\n".join(lines)
+
+
+class ProfilerPanel(QDockWidget):
+    def __init__(self, parent=None):
+        super().__init__("Rendimiento", parent)
+        self.setObjectName("profiler_panel")
+        body = QWidget()
+        layout = QVBoxLayout(body)
+
+        controls = QHBoxLayout()
+        self.plans_check = QCheckBox("Capturar EXPLAIN QUERY PLAN")
+        self.plans_check.setChecked(profiler.capture_plans())
+        self.plans_check.toggled.connect(profiler.set_capture_plans)
+        controls.addWidget(self.plans_check)
+        save_button = QPushButton("Guardar JSONL...")
+        save_button.clicked.connect(self.choose_log_path)
+        controls.addWidget(save_button)
+        clear_button = QPushButton("Limpiar")
+        clear_button.clicked.connect(profiler.clear)
+        controls.addWidget(clear_button)
+        controls.addStretch()
+        self.log_label = QLabel()
+        controls.addWidget(self.log_label)
+        layout.addLayout(controls)
+
+        self.table = QTableWidget(0, len(HEADERS))
+        self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(len(HEADERS) - 1, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+        self.setWidget(body)
+
+        # Entries come from worker threads too, so the panel polls instead of
+        # receiving a signal per timing.
+        self.shown_sequence = -1
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_MS)
+        self._update_log_label()
+        self.refresh()
+
+    def choose_log_path(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Guardar tiempos", "perfil.jsonl", "JSON Lines (*.jsonl)"
+        )
+        if path:
+            profiler.set_log_path(path)
+            self._update_log_label()
+
+    def _update_log_label(self):
+        path = profiler.log_path()
+        self.log_label.setText(f"Registro: {path}" if path else "")
+
+    def refresh(self):
+        if not self.isVisible() or profiler.sequence() == self.shown_sequence:
+            return
+        self.shown_sequence = profiler.sequence()
+        entries = profiler.entries()[::-1]
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(entries))
+        for r, entry in enumerate(entries):
+            values = (
+                time.strftime("%H:%M:%S", time.localtime(entry["ts"])),
+                entry["name"],
+                f"{entry['ms']:.1f}",
+                "" if entry.get("rows") is None else str(entry["rows"]),
+                _detail(entry),
+            )
+            tooltip = _tooltip(entry)
+            for c, text in enumerate(values):
+                item = QTableWidgetItem(text)
+                item.setToolTip(tooltip)
+                self.table.setItem(r, c, item)
+        self.table.setUpdatesEnabled(True)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
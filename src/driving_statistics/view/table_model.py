@@ -0,0 +1,133 @@
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from driving_statistics.services import database
+from driving_statistics.services.database import iter_fetch
+
+PAGE_SIZE = 256
+
+
+def _default_formatter(col_key, value):
+    return "" if value is None else str(value)
+
+
+class QueryTableModel(QAbstractTableModel):
+    """Table model that streams the rows of a SELECT from an open cursor, one page at a time.
+
+    The cursor runs on the model's own connection, so the snapshot it holds
+    does not hide newer data from the other queries on the GUI thread.
+    """
+
+    def __init__(self, formatter=None, parent=None):
+        super().__init__(parent)
+        self._formatter = formatter or _default_formatter
+        self._sql = ""
+        self._params = []
+        self._cols = []
+        self._headers = []
+        self._order = ""
+        self._rows = []
+        self._batches = None
+        self._exhausted = True
+        self._conn = None
+        self._conn_path = None
+
+    def set_query(self, sql, params, cols, headers, rows=None, more=False):
+        # `rows` is the result when the caller already has it; with `more` only
+        # its first rows, and the rest is read once the view scrolls past them.
+        self.beginResetModel()
+        self._sql = sql
+        self._params = list(params)
+        self._cols = list(cols)
+        self._headers = list(headers)
+        self._order = ""
+        if rows is None:
+            self._restart()
+        else:
+            self._close_batches()
+            self._rows = list(rows)
+            self._exhausted = not more
+        self.endResetModel()
+        if rows is None:
+            self.fetchMore(QModelIndex())
+
+    def _close_batches(self):
+        if self._batches is not None:
+            self._batches.close()
+            self._batches = None
+
+    def _connection(self):
+        if self._conn is None or self._conn_path != database.DB_PATH:
+            self.close()
+            self._conn = database.open_read_connection()
+            self._conn_path = database.DB_PATH
+        return self._conn
+
+    def close(self):
+        self._close_batches()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _open_batches(self):
+        # Continues after the rows already held, e.g. a first page passed in.
+        self._batches = iter_fetch(
+            f"SELECT * FROM ({self._sql}){self._order} LIMIT -1 OFFSET ?",
+            [*self._params, len(self._rows)], PAGE_SIZE, self._connection(),
+        )
+
+    def _restart(self):
+        self._close_batches()
+        self._rows = []
+        self._open_batches()
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cols)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self._rows[index.row()][index.column()]
+        return self._formatter(self._cols[index.column()], value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section] if section < len(self._headers) else None
+        return section + 1
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or not self._sql:
+            return
+        if self._batches is None:
+            self._open_batches()
+        page = next(self._batches, [])
+        if len(page) < PAGE_SIZE:
+            self._exhausted = True
+            self._close_batches()
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # setSortingEnabled(True) calls sort(-1): nothing to re-query when unsorted.
+        if not self._sql or (column < 0 and not self._order):
+            return
+        self.beginResetModel()
+        if 0 <= column < len(self._cols):
+            direction = "DESC" if order == Qt.SortOrder.DescendingOrder else "ASC"
+            self._order = f" ORDER BY {column + 1} {direction}"
+        else:
+            self._order = ""
+        self._restart()
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
@@ -0,0 +1,33 @@
+import pytest
+
+from driving_statistics.services.csv_importer import iter_exam_records, iter_exam_records_pandas
+
+pytest.importorskip("pandas")
+
+HEADER = "desc_provincia;centro_examen;tipo_examen;nombre_autoescuela;mes;num_aptos;num_no_aptos\n"
+
+FILES = {
+    "empty": "",
+    "header_only": HEADER,
+    "short_rows": HEADER + "Madrid;Norte;B;Escuela A;3;10\nMadrid;Sur;B;Escuela B;3;4;2\n",
+    "long_rows": HEADER + "Madrid;Norte;B;Escuela A;3;10;5;;\nMadrid;Sur;B;Escuela B;3;4;2;extra;more\n",
+    "headerless_ragged": (
+        "Madrid,Norte,B,Escuela A,2024-03,12,8,4\n"
+        "Madrid,Sur,B,Escuela B,2024-03,9,5\n"
+        "\n"
+        "Avila,Centro,A,Escuela C,2024-04,3\n"
+        "Avila,Centro,A,Escuela D\n"
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(FILES))
+@pytest.mark.parametrize("chunk_rows", [1, 1000])
+def test_pandas_engine_matches_python_engine(tmp_path, name, chunk_rows):
+    path = tmp_path / f"{name}.csv"
+    path.write_text(FILES[name], encoding="utf-8")
+
+    expected = list(iter_exam_records(str(path)))
+    assert list(iter_exam_records_pandas(str(path), chunk_rows=chunk_rows)) == expected
+    if name not in ("empty", "header_only"):
+        assert expected
@@ -0,0 +1,39 @@
+import pytest
+
+from driving_statistics import synthetic_data
+from driving_statistics.services import database
+from driving_statistics.services.csv_importer import save_csv_to_db
+from driving_statistics.services.queries import ALL_MONTHS, build_filtered_query
+
+COLS = ["province", "exam_center", "driving_school", "exam_type", "exam_month", "presented", "passed", "failed"]
+
+
+@pytest.fixture
+def small_database(tmp_path, monkeypatch):
+    database.close_read_connections()
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "exams.db")
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    database.init_database()
+    dataset = tmp_path / "dataset.txt"
+    synthetic_data.write_dataset(dataset, 2000)
+    save_csv_to_db(dataset)
+    yield
+    database.close_read_connections()
+
+
+def _filters(**overrides):
+    filters = {"from_ym": ALL_MONTHS[0], "to_ym": ALL_MONTHS[1], "limit": 0, "group_by": []}
+    filters.update(overrides)
+    return filters
+
+
+@pytest.mark.parametrize("filters", [
+    _filters(province="Madrid"),
+    _filters(driving_school="RONDA 1"),
+    _filters(exam_center="MADRID", exam_type="TEORICA"),
+    _filters(from_ym="2000-03", to_ym="2000-05"),
+    _filters(province="Sevilla", from_ym="2000-03", to_ym="2000-05"),
+], ids=["province", "text", "text_type", "month_range", "province_month_range"])
+def test_filter_queries_do_not_scan_exams(small_database, filters):
+    sql, params, _cols, _headers = build_filtered_query(COLS, filters)
+    assert database.full_table_scans(sql, params) == []
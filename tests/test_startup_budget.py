@@ -0,0 +1,10 @@
+import pytest
+
+from driving_statistics.startup_budget import BUDGET_MS, check
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+
+def test_gui_controller_imports_within_budget():
+    total_ms, problems = check()
+    assert problems == [], f"{total_ms:.0f} ms de {BUDGET_MS} ms"